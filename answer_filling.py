@@ -1,5 +1,373 @@
+"""
+Bulk answer-key import for "AA" exams, whose answers come in a separate document.
+
+Answer keys are parsed from plain text ("1-BC", "2) A", "3: D E", several per line or
+one per table row, with "[unique_id]" lines switching exams) or from CSV/TSV tables with
+a unique_id column. An index of a whole cleaned corpus, keyed by (unique_id, question
+number), checks every key against the question's options in memory; only the exams that
+actually change are then rewritten.
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from collections import defaultdict
+from pathlib import Path, PurePosixPath
+
 import streamlit as st
 
+from clean_directory import archive_prefix, default_json_loads, iter_archive_exams
+
+try:
+    import orjson
+except ImportError:  # optional, faster JSON writing
+    orjson = None
+
+OPTION_LETTERS = "ABCDE"
+
+_SECTION = re.compile(r"^\s*\[([^\]]+)\]\s*$")
+# Upper-case letters may follow the number after a delimiter or a space ("1-BC", "2 A");
+# lower-case ones only after a delimiter ("3) d e"), so prose such as "Question 3 a été
+# annulée" is not read as a key.
+_KEY_ENTRY = re.compile(
+    r"(?<!\w)(?:[Qq]\s*)?(?P<number>\d{1,4})\s*"
+    r"(?:(?:[-–.):;,|°]\s*|\s+)\|?\s*(?P<upper>[A-E](?:\s*[,/+&]?\s*[A-E])*)"
+    r"|[-–.):;,|°]\s*\|?\s*(?P<lower>[a-e](?:\s*[,/+&]?\s*[a-e])*))"
+    r"(?![A-Za-z0-9])"
+)
+_LETTERS = re.compile(r"[A-E]", re.I)
+_UID_COLUMNS = ("unique_id", "exam", "exam_id")
+_NUMBER_COLUMNS = ("question", "number", "question_number", "q")
+_ANSWER_COLUMNS = ("answers", "answer", "correct_answers", "key")
+
+
+def _letters(text: str) -> list[str]:
+    letters = []
+    for letter in _LETTERS.findall(text):
+        letter = letter.upper()
+        if letter not in letters:
+            letters.append(letter)
+    return letters
+
+
+def _add_key(keys: dict, problems: list, unique_id, number: int, letters: list[str], line: int):
+    key = (unique_id, number)
+    previous = keys.get(key)
+    if previous is not None and previous != letters:
+        problems.append(
+            {
+                "kind": "duplicate_key",
+                "unique_id": unique_id,
+                "question": number,
+                "line": line,
+                "detail": f"{''.join(previous)} then {''.join(letters)}; the last one is kept",
+            }
+        )
+    keys[key] = letters
+
+
+def _table_dialect(text: str):
+    """The CSV dialect of text when its first line is a header naming question and answers columns."""
+    first_line = text.split("\n", 1)[0]
+    try:
+        dialect = csv.Sniffer().sniff(first_line, delimiters=",;\t|")
+    except csv.Error:
+        return None
+    header = {cell.strip().lower() for cell in next(csv.reader([first_line], dialect), [])}
+    if header.intersection(_ANSWER_COLUMNS) and header.intersection(_NUMBER_COLUMNS):
+        return dialect
+    return None
+
+
+def _parse_table(text: str, default_unique_id, dialect) -> tuple[dict, list]:
+    rows = csv.DictReader(io.StringIO(text), dialect=dialect)
+    columns = {name.strip().lower(): name for name in rows.fieldnames or []}
+
+    def column(candidates):
+        return next((columns[name] for name in candidates if name in columns), None)
+
+    uid_column = column(_UID_COLUMNS)
+    number_column = column(_NUMBER_COLUMNS)
+    answer_column = column(_ANSWER_COLUMNS)
+    keys, problems = {}, []
+    if number_column is None or answer_column is None:
+        problems.append({"kind": "bad_table", "line": 1, "detail": "needs a question and an answers column"})
+        return keys, problems
+    for line, row in enumerate(rows, start=2):
+        number = (row.get(number_column) or "").strip()
+        letters = _letters(row.get(answer_column) or "")
+        unique_id = (row.get(uid_column) or "").strip() if uid_column else default_unique_id
+        if not number.isdigit() or not letters:
+            problems.append({"kind": "unreadable", "line": line, "detail": ",".join(map(str, row.values()))})
+            continue
+        _add_key(keys, problems, unique_id or default_unique_id, int(number), letters, line)
+    return keys, problems
+
+
+def parse_answer_key(text: str, default_unique_id: str | None = None) -> tuple[dict, list]:
+    """
+    Parses an answer-key document into {(unique_id, question number): [letters]} and a list
+    of problems. Keys before any "[unique_id]" line belong to default_unique_id. A first line
+    that is a CSV/TSV header with a question and an answers column (and optionally a
+    unique_id column) makes the document a table instead.
+    """
+    dialect = _table_dialect(text.lstrip())
+    if dialect is not None:
+        try:
+            return _parse_table(text.lstrip(), default_unique_id, dialect)
+        except csv.Error:
+            pass  # not a well-formed table after all; read it as plain text
+
+    keys, problems = {}, []
+    unique_id = default_unique_id
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        section = _SECTION.match(line)
+        if section:
+            unique_id = section.group(1).strip()
+            continue
+        for match in _KEY_ENTRY.finditer(line):
+            letters = _letters(match.group("upper") or match.group("lower"))
+            _add_key(keys, problems, unique_id, int(match.group("number")), letters, line_number)
+    return keys, problems
+
+
+class AnswerIndex:
+    """
+    Per-question option letters and current answers of a cleaned corpus, keyed by
+    unique_id (falling back to the file name) and 1-based question number.
+    """
+
+    def __init__(self):
+        self.paths = defaultdict(list)  # unique_id -> relative paths
+        self.questions = {}  # relative path -> [(option letters, current answers)]
+
+    @classmethod
+    def build(cls, exams, json_loads=None) -> "AnswerIndex":
+        """exams yields (relative path, load) pairs, as clean_directory's iterators do."""
+        loads = json_loads or default_json_loads()
+        index = cls()
+        for rel_path, load in exams:
+            data = loads(load())
+            metadata = data.get("metadata", {}) or {}
+            unique_id = str(metadata.get("unique_id") or PurePosixPath(rel_path).stem)
+            index.paths[unique_id].append(rel_path)
+            index.questions[rel_path] = [
+                (
+                    "".join(letter for letter in OPTION_LETTERS if letter in (question.get("options") or {})),
+                    tuple(question.get("correct_answers") or ()),
+                )
+                for question in data.get("content", {}).get("questions", [])
+            ]
+        return index
+
+    def match(self, keys: dict, overwrite: bool = False) -> dict:
+        """
+        Joins keys onto the indexed questions. Returns "updates" ({path: {question index:
+        letters}}), "mismatches" (keys that cannot be applied, and keyed exams left with
+        unanswered questions) and counts.
+        """
+        updates = defaultdict(dict)
+        mismatches = []
+        unchanged = 0
+        keys_by_exam = defaultdict(dict)
+        for (unique_id, number), letters in keys.items():
+            keys_by_exam[unique_id][number] = letters
+
+        for unique_id, exam_keys in keys_by_exam.items():
+            paths = self.paths.get(unique_id, [])
+            if len(paths) != 1:
+                mismatches.append(
+                    {
+                        "kind": "unknown_exam" if not paths else "ambiguous_exam",
+                        "unique_id": unique_id,
+                        "detail": f"{len(exam_keys)} keys" + (f"; files: {', '.join(paths)}" if paths else ""),
+                    }
+                )
+                continue
+            path = paths[0]
+            questions = self.questions[path]
+            for number, letters in sorted(exam_keys.items()):
+                if not 1 <= number <= len(questions):
+                    mismatches.append(
+                        {
+                            "kind": "unknown_question",
+                            "unique_id": unique_id,
+                            "question": number,
+                            "detail": f"the exam has {len(questions)} questions",
+                        }
+                    )
+                    continue
+                option_letters, current = questions[number - 1]
+                missing = [letter for letter in letters if letter not in option_letters]
+                if missing:
+                    mismatches.append(
+                        {
+                            "kind": "invalid_option",
+                            "unique_id": unique_id,
+                            "question": number,
+                            "detail": f"{''.join(missing)} not in options {option_letters or '(none)'}",
+                        }
+                    )
+                elif tuple(letters) == current:
+                    unchanged += 1
+                elif current and not overwrite:
+                    mismatches.append(
+                        {
+                            "kind": "conflict",
+                            "unique_id": unique_id,
+                            "question": number,
+                            "detail": f"has {''.join(current)}, key says {''.join(letters)}",
+                        }
+                    )
+                else:
+                    updates[path][number - 1] = letters
+
+            unanswered = [
+                number
+                for number, (_options, current) in enumerate(questions, start=1)
+                if not current and number not in exam_keys
+            ]
+            if unanswered:
+                mismatches.append(
+                    {
+                        "kind": "missing_keys",
+                        "unique_id": unique_id,
+                        "detail": "questions " + ", ".join(map(str, unanswered)),
+                    }
+                )
+
+        return {
+            "updates": dict(updates),
+            "mismatches": mismatches,
+            "updated_questions": sum(len(changes) for changes in updates.values()),
+            "updated_exams": len(updates),
+            "unchanged": unchanged,
+        }
+
+
+def _has_float(value) -> bool:
+    if isinstance(value, float):
+        return True
+    if isinstance(value, dict):
+        return any(map(_has_float, value.values()))
+    if isinstance(value, list):
+        return any(map(_has_float, value))
+    return False
+
+
+def serialize_exam(data: dict) -> bytes:
+    """
+    The cleaner's output bytes (json.dumps, 2-space indent, UTF-8). orjson writes them much
+    faster, but spells floats differently (1e20 for 1e+20) and rejects integers beyond 64
+    bits, so exams holding either go through json.dumps.
+    """
+    if orjson is not None and not _has_float(data):
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def apply_updates(data: dict, changes: dict) -> dict:
+    """Sets correct_answers and isAnswered on the questions of one exam ({index: letters})."""
+    questions = data["content"]["questions"]
+    for index, letters in changes.items():
+        questions[index]["correct_answers"] = list(letters)
+        questions[index]["isAnswered"] = True
+    return data
+
+
+def write_updated_archive(archive, updates: dict, output, prefix: str = "cleaned", json_loads=None):
+    """
+    Copies a cleaned archive (bytes or a path) to output, rewriting only the exams under
+    prefix that have updates; every other member is copied unchanged.
+    """
+    loads = json_loads or default_json_loads()
+    source = zipfile.ZipFile(io.BytesIO(archive) if isinstance(archive, bytes) else archive)
+    root = PurePosixPath(prefix)
+    with source, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            member = PurePosixPath(info.filename)
+            rel_path = member.relative_to(root).as_posix() if root in member.parents else None
+            if rel_path in updates:
+                data = apply_updates(loads(source.read(info)), updates[rel_path])
+                target.writestr(info.filename, serialize_exam(data))
+            else:
+                target.writestr(info, source.read(info))
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_archive_index(archive_bytes: bytes, prefix: str) -> AnswerIndex:
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        return AnswerIndex.build(iter_archive_exams(archive, prefix))
+
+
 def show_answer_filling_page():
     st.title("Answer Filling and Verification")
-    st.write("This page is under construction.")
\ No newline at end of file
+    st.write(
+        "Upload a cleaned ZIP (from Clean Folder) and the answer keys. Keys are checked against "
+        "every exam's options before anything is changed."
+    )
+
+    uploaded_zip = st.file_uploader("Cleaned exams ZIP", type="zip", key="answer_filling_zip")
+    if uploaded_zip is None:
+        return
+    archive_bytes = uploaded_zip.getvalue()
+    try:
+        with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+            prefix = archive_prefix(archive)
+        with st.spinner("Indexing exams..."):
+            index = build_archive_index(archive_bytes, prefix)
+    except (zipfile.BadZipFile, ValueError) as exc:
+        st.error(f"Could not read the archive: {exc}")
+        return
+    st.caption(f"{len(index.questions)} exams, {sum(map(len, index.questions.values()))} questions indexed.")
+
+    key_file = st.file_uploader("Answer key document", type=["txt", "csv", "tsv"], key="answer_filling_keys")
+    key_text = st.text_area(
+        "Or paste answer keys",
+        height=200,
+        help='One or more keys per line ("1-BC 2-A", "3) D E", table rows), "[unique_id]" lines '
+        "to switch exams, or a CSV with unique_id, question and answers columns.",
+    )
+    default_unique_id = st.selectbox(
+        "Exam for keys without a [unique_id] line",
+        options=[None] + sorted(index.paths),
+        format_func=lambda unique_id: "(none)" if unique_id is None else unique_id,
+    )
+    overwrite = st.checkbox("Overwrite existing answers", value=False)
+
+    if not st.button("Check and Apply Keys", type="primary"):
+        return
+    text = key_file.getvalue().decode("utf-8-sig", errors="replace") if key_file is not None else key_text
+    keys, problems = parse_answer_key(text, default_unique_id)
+    if not keys:
+        st.error("No answer keys were found.")
+        return
+    if any(unique_id is None for unique_id, _number in keys):
+        st.error("Some keys do not belong to an exam. Add a [unique_id] line or pick an exam above.")
+        return
+
+    matched = index.match(keys, overwrite=overwrite)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Keys Read", len(keys))
+    col2.metric("Questions Updated", matched["updated_questions"])
+    col3.metric("Exams Updated", matched["updated_exams"])
+    col4.metric("Mismatches", len(matched["mismatches"]) + len(problems))
+
+    if problems or matched["mismatches"]:
+        st.subheader("Mismatches")
+        st.dataframe(problems + matched["mismatches"], width="stretch")
+
+    if matched["updates"]:
+        output = io.BytesIO()
+        write_updated_archive(archive_bytes, matched["updates"], output, prefix)
+        st.download_button(
+            "Download Answered ZIP",
+            data=output.getvalue(),
+            file_name=f"{Path(uploaded_zip.name).stem}_answered.zip",
+            mime="application/zip",
+        )
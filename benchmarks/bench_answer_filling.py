@@ -0,0 +1,85 @@
+"""
+Measures bulk answer-key import on a cleaned synthetic corpus.
+
+Usage:
+    python benchmarks/bench_answer_filling.py [--questions 100000] [--errors 0.01]
+
+A synthetic corpus is cleaned into a ZIP as the Clean Folder page produces it. A CSV answer
+key covering every question (with --errors of the keys pointing at options that do not
+exist) is then parsed, the corpus indexed, the keys matched and the answered ZIP written.
+"""
+
+import argparse
+import io
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from answer_filling import AnswerIndex, parse_answer_key, write_updated_archive  # noqa: E402
+from clean_directory import MedicalDataCleaner, iter_archive_exams  # noqa: E402
+from synthetic_corpus import generate_corpus, zip_directory  # noqa: E402
+
+
+def make_key_csv(index: AnswerIndex, errors: float, seed: int = 0) -> tuple[str, int]:
+    rnd = random.Random(seed)
+    rows = ["unique_id,question,answers"]
+    bad = 0
+    for unique_id, paths in index.paths.items():
+        if len(paths) != 1:
+            continue
+        for number, (option_letters, _current) in enumerate(index.questions[paths[0]], start=1):
+            if rnd.random() < errors:
+                answers = "E" if "E" not in option_letters else "AE"
+                bad += "E" not in option_letters
+            else:
+                answers = "".join(rnd.sample(option_letters, rnd.randint(1, min(3, len(option_letters)))))
+            rows.append(f"{unique_id},{number},{answers}")
+    return "\n".join(rows), bad
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<18} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--errors", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus = generate_corpus(Path(work_dir) / "corpus", args.questions)
+        archive = io.BytesIO()
+        MedicalDataCleaner().process_zip(
+            io.BytesIO(zip_directory(corpus["root"])), archive, stream_reports=True
+        )
+    archive_bytes = archive.getvalue()
+
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        index = timed("index", lambda: AnswerIndex.build(iter_archive_exams(archive)))
+    key_text, bad_keys = make_key_csv(index, args.errors)
+    keys, problems = timed("parse keys", lambda: parse_answer_key(key_text))
+    matched = timed("match", lambda: index.match(keys, overwrite=True))
+    timed("write archive", lambda: write_updated_archive(archive_bytes, matched["updates"], io.BytesIO()))
+
+    invalid = sum(entry["kind"] == "invalid_option" for entry in matched["mismatches"])
+    if invalid != bad_keys or problems:
+        sys.exit(f"expected {bad_keys} invalid options, got {invalid} (problems: {problems[:3]})")
+    print(
+        f"{len(index.questions)} exams, {len(keys)} keys, {matched['updated_questions']} questions "
+        f"updated in {matched['updated_exams']} exams, {len(matched['mismatches'])} mismatches"
+    )
+
+
+if __name__ == "__main__":
+    main()
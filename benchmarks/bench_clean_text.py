@@ -0,0 +1,104 @@
+"""
+Compares the single-pass clean_texts engine against the original clean_text.
+
+Usage:
+    python benchmarks/bench_clean_text.py [CORPUS_DIR] [--repeat N]
+
+Without CORPUS_DIR the texts of the bundled sample exam are used. Both implementations
+must produce identical texts and stripped-character counts; the script exits with an
+error otherwise.
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from clean_directory import MedicalDataCleaner  # noqa: E402
+
+SAMPLE_EXAM = REPO_ROOT / "updated_S1_UIR_Anatomie_I_2024-2.json"
+
+
+def legacy_clean_text(cleaner, stripped_chars, txt, is_q):
+    s = txt.strip()
+    for old, new in cleaner.smart_map.items():
+        s = s.replace(old, new)
+    s = cleaner.p["q_prefix"].sub("", s) if is_q else cleaner.p["o_prefix"].sub("", s)
+    for ch in cleaner.p["invalid"].findall(s):
+        stripped_chars[ch] += 1
+    s = cleaner.p["invalid"].sub("", s)
+    s = cleaner.p["trailing"].sub("", s)
+    s = cleaner.p["multi_sp"].sub(" ", s).strip()
+    if s and s[0].isalpha() and s[0].islower():
+        s = s[0].upper() + s[1:]
+    return s
+
+
+def load_texts(cleaner, corpus_dir):
+    files = cleaner.iter_json_files(Path(corpus_dir)) if corpus_dir else [SAMPLE_EXAM]
+    questions, options = [], []
+    for file_path in files:
+        data = cleaner.read_json_file(file_path)
+        for question in data.get("content", {}).get("questions", []):
+            questions.append(question.get("question", ""))
+            options.extend(
+                value for value in question.get("options", {}).values() if isinstance(value, str)
+            )
+    return questions, options
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus_dir", nargs="?", help="directory of exam JSON files")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cleaner = MedicalDataCleaner()
+    questions, options = load_texts(cleaner, args.corpus_dir)
+    total = len(questions) + len(options)
+    if not total:
+        sys.exit("No texts found.")
+
+    def run_legacy():
+        stripped_chars = defaultdict(int)
+        texts = [legacy_clean_text(cleaner, stripped_chars, txt, True) for txt in questions]
+        texts += [legacy_clean_text(cleaner, stripped_chars, txt, False) for txt in options]
+        return texts, dict(stripped_chars)
+
+    def run_single():
+        cleaner.reset_logs()
+        texts = [cleaner.clean_text(txt, True) for txt in questions]
+        texts += [cleaner.clean_text(txt, False) for txt in options]
+        return texts, dict(cleaner.stripped_chars)
+
+    def run_batch():
+        cleaner.reset_logs()
+        texts = cleaner.clean_texts(questions, True) + cleaner.clean_texts(options, False)
+        return texts, dict(cleaner.stripped_chars)
+
+    legacy_time, legacy_result = best_of(args.repeat, run_legacy)
+    print(f"{total} texts ({len(questions)} questions, {len(options)} options)")
+    print(f"{'legacy clean_text':<20} {legacy_time * 1000:9.2f} ms")
+
+    for label, func in (("clean_text", run_single), ("clean_texts", run_batch)):
+        elapsed, result = best_of(args.repeat, func)
+        if result != legacy_result:
+            sys.exit(f"{label} output differs from the legacy implementation.")
+        print(f"{label:<20} {elapsed * 1000:9.2f} ms  x{legacy_time / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Measures cleaner throughput on synthetic corpora.
+
+Usage:
+    python benchmarks/bench_cleaner.py [--sizes 100 1000 10000 100000] [--workers N]
+                                       [--skip-archive] [--json results.json]
+
+Each corpus size runs in a fresh process so the reported peak RSS belongs to that case
+alone. process_directory is timed on the generated tree and clean_uploaded_archive on the
+same tree zipped, as the Clean Folder page receives it.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from clean_directory import MedicalDataCleaner  # noqa: E402
+from synthetic_corpus import generate_corpus, zip_directory  # noqa: E402
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+class UploadedArchive(io.BytesIO):
+    """Stands in for Streamlit's UploadedFile."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def stage(stages, name):
+    start = time.perf_counter()
+    yield
+    stages[name] = time.perf_counter() - start
+
+
+def run_case(size: int, workers: int, skip_archive: bool, seed: int) -> dict:
+    stages = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_root = Path(temp_dir)
+        corpus_dir = temp_root / "corpus"
+
+        with stage(stages, "generate"):
+            corpus = generate_corpus(corpus_dir, size, seed=seed)
+
+        cleaner = MedicalDataCleaner()
+        with stage(stages, "discover"):
+            discovered = sum(1 for _ in cleaner.iter_json_entries(corpus_dir))
+
+        with stage(stages, "process_directory"):
+            result = cleaner.process_directory(
+                corpus_dir,
+                output_dir=temp_root / "cleaned",
+                reports_dir=temp_root / "reports",
+                workers=workers,
+            )
+
+        case = {
+            "questions": corpus["questions"],
+            "json_files": corpus["json_files"],
+            "discovered_files": discovered,
+            "cleaned_files": result["cleaned_json_files"],
+            "workers": workers,
+        }
+
+        if not skip_archive:
+            from streamlit_app import clean_uploaded_archive
+
+            with stage(stages, "zip_input"):
+                upload = UploadedArchive(zip_directory(corpus_dir), "corpus.zip")
+            with stage(stages, "clean_uploaded_archive"):
+                archive_result = clean_uploaded_archive(upload)
+            case["archive_mb"] = len(upload.getvalue()) / 1024 / 1024
+            case["cleaned_archive_mb"] = len(archive_result["archive_bytes"]) / 1024 / 1024
+
+    elapsed = stages["process_directory"]
+    case["files_per_sec"] = corpus["json_files"] / elapsed
+    case["questions_per_sec"] = corpus["questions"] / elapsed
+    if "clean_uploaded_archive" in stages:
+        archive_elapsed = stages["clean_uploaded_archive"]
+        case["archive_files_per_sec"] = corpus["json_files"] / archive_elapsed
+        case["archive_questions_per_sec"] = corpus["questions"] / archive_elapsed
+    case["stages"] = stages
+    case["peak_rss_mb"] = peak_rss_mb()
+    return case
+
+
+def print_case(size, case):
+    print(f"\n== {size} questions ({case['json_files']} files, {case['workers']} worker(s)) ==")
+    print(f"  process_directory      {case['files_per_sec']:10.1f} files/s {case['questions_per_sec']:12.1f} questions/s")
+    if "archive_files_per_sec" in case:
+        print(
+            f"  clean_uploaded_archive {case['archive_files_per_sec']:10.1f} files/s "
+            f"{case['archive_questions_per_sec']:12.1f} questions/s"
+        )
+    print(f"  peak RSS               {case['peak_rss_mb']:10.1f} MB")
+    for name, seconds in case["stages"].items():
+        print(f"  {name:<22} {seconds * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-archive", action="store_true", help="skip clean_uploaded_archive")
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            case = executor.submit(run_case, size, args.workers, args.skip_archive, args.seed).result()
+        results[size] = case
+        print_case(size, case)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
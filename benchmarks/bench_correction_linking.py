@@ -0,0 +1,131 @@
+"""
+Measures correction-to-question retrieval at corpus scale.
+
+Usage:
+    python benchmarks/bench_correction_linking.py [--questions 100000] [--queries 1000]
+                                                  [--top-k 3] [--max-df 0.05]
+                                                  [--vocabulary 30000] [--brute-force 20]
+
+The synthetic cleaning corpus draws from a few dozen words, far too few to tell questions
+apart, so question texts (stem plus options) are drawn here from a Zipf-distributed
+vocabulary instead, the way real exam wording is: a handful of very common words and a long
+tail of rare terms. Each query is a correction paragraph written from one random question
+(most of its words, shuffled, plus common filler words). Latency is reported per query
+with recall (the source question among the top k). --brute-force queries are also scored
+against every question, the all-pairs comparison the index replaces.
+"""
+
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from itertools import accumulate
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from correction_linking import DEFAULT_MAX_DF, TfidfIndex, tokenize  # noqa: E402
+
+SYLLABLES = (
+    "ar te ve ne mus cle os cor fo re pul mo cel lu mem bra pro ti en zy hor gan gli on ple xus "
+    "ten li ga ment ver tè bre crâ tho rax ab do bas sin fé mur ti bia hu mé ra di ul na ster num"
+).split()
+
+
+def make_vocabulary(size: int, rnd: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))))
+    return sorted(words)
+
+
+def make_questions(count: int, vocabulary: list[str], rnd: random.Random) -> list[str]:
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def words(low, high):
+        return " ".join(rnd.choices(vocabulary, cum_weights=cum_weights, k=rnd.randint(low, high)))
+
+    return [
+        " ".join([words(8, 25)] + [words(2, 10) for _option in range(rnd.choice([4, 5, 5]))])
+        for _question in range(count)
+    ]
+
+
+def make_correction(rnd: random.Random, text: str, vocabulary: list[str]) -> str:
+    words = text.split()
+    kept = rnd.sample(words, max(1, int(len(words) * 0.6)))
+    filler = rnd.choices(vocabulary[:50], k=max(3, len(kept) // 3))
+    mixed = kept + filler
+    rnd.shuffle(mixed)
+    return "Correction : " + " ".join(mixed)
+
+
+def brute_force(documents: list[Counter], idf: dict, text: str) -> int:
+    """Index of the question most cosine-similar to text, scoring every question."""
+    query = Counter(term for term in tokenize(text) if term in idf)
+    best_score, best_doc = -1.0, -1
+    for doc, counts in enumerate(documents):
+        weights = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items() if term in idf}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        score = sum((1 + math.log(count)) * idf[term] * weights.get(term, 0.0) for term, count in query.items()) / norm
+        if score > best_score:
+            best_score, best_doc = score, doc
+    return best_doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--max-df", type=float, default=DEFAULT_MAX_DF)
+    parser.add_argument("--vocabulary", type=int, default=30000)
+    parser.add_argument("--brute-force", type=int, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    vocabulary = make_vocabulary(args.vocabulary, rnd)
+    texts = make_questions(args.questions, vocabulary, rnd)
+    ids = [f"exam{number // 50:05d}.json#{number % 50 + 1}" for number in range(len(texts))]
+
+    start = time.perf_counter()
+    index = TfidfIndex(max_df=args.max_df).build((doc_id, text, text) for doc_id, text in zip(ids, texts))
+    print(f"index: {len(index)} questions, {len(index.postings)} terms in {time.perf_counter() - start:.2f} s")
+
+    targets = rnd.sample(range(len(texts)), min(args.queries, len(texts)))
+    queries = [make_correction(rnd, texts[target], vocabulary) for target in targets]
+
+    start = time.perf_counter()
+    results = index.search_batch(queries, args.top_k)
+    batch_seconds = time.perf_counter() - start
+    latencies = []
+    for query in queries:
+        query_start = time.perf_counter()
+        index.search(query, args.top_k)
+        latencies.append((time.perf_counter() - query_start) * 1000)
+    latencies.sort()
+
+    recall_1 = sum(bool(matches) and matches[0][0] == ids[target] for target, matches in zip(targets, results))
+    recall_k = sum(ids[target] in {doc_id for doc_id, _score in matches} for target, matches in zip(targets, results))
+    print(
+        f"search: {len(queries)} queries batched in {batch_seconds:.2f} s; per query "
+        f"mean {statistics.fmean(latencies):.2f} ms, p50 {latencies[len(latencies) // 2]:.2f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:.2f} ms"
+    )
+    print(f"recall@1 {recall_1 / len(queries):.3f}, recall@{args.top_k} {recall_k / len(queries):.3f}")
+
+    if args.brute_force:
+        documents = [Counter(tokenize(text)) for text in texts]
+        sample = list(zip(targets, queries))[: args.brute_force]
+        start = time.perf_counter()
+        found = sum(brute_force(documents, index.idf, query) == target for target, query in sample)
+        per_query = (time.perf_counter() - start) * 1000 / len(sample)
+        print(f"brute force: {per_query:.1f} ms per query, top match correct for {found}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
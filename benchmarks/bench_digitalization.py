@@ -0,0 +1,80 @@
+"""
+Measures PDF extraction time on a synthetic exam PDF.
+
+Usage:
+    python benchmarks/bench_digitalization.py [--pages 10 100] [--workers N]
+
+For each page count a PDF is generated with six questions and one image per page. It is
+extracted with one worker, with the process pool, and again with a warm page cache,
+which is what a re-run after a parser change costs.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pymupdf
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from digitalization import PdfExamExtractor  # noqa: E402
+
+DEFAULT_PAGES = [10, 100]
+QUESTIONS_PER_PAGE = 6
+
+
+def make_pdf(page_count: int) -> bytes:
+    document = pymupdf.open()
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 120, 80), False)
+    number = 1
+    for page_number in range(page_count):
+        page = document.new_page()
+        page.insert_text((72, 40), "Faculté de Médecine - Examen d'Anatomie", fontsize=9)
+        y = 80
+        for _ in range(QUESTIONS_PER_PAGE):
+            page.insert_text((72, y), f"{number}° Concernant le plexus brachial, indiquer la (les) proposition(s) exacte(s) :", fontsize=10)
+            for letter in "ABCDE":
+                y += 14
+                page.insert_text((90, y), f"{letter}- Proposition {letter} de la question {number}", fontsize=10)
+            y += 22
+            number += 1
+        pixmap.clear_with(40 * (page_number % 6))
+        page.insert_image(pymupdf.Rect(400, y - 100, 520, y - 20), pixmap=pixmap)
+        page.insert_text((290, 820), f"{page_number + 1}/{page_count}", fontsize=9)
+    return document.tobytes()
+
+
+def time_extract(extractor: PdfExamExtractor, pdf: bytes) -> tuple[float, dict]:
+    start = time.perf_counter()
+    result = extractor.extract(pdf)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'questions':>9} {'1 worker':>10} {f'{args.workers} workers':>11} {'warm cache':>11}")
+    for page_count in args.pages:
+        pdf = make_pdf(page_count)
+        serial, result = time_extract(PdfExamExtractor(workers=1), pdf)
+        expected = page_count * QUESTIONS_PER_PAGE
+        if len(result["questions"]) != expected:
+            raise RuntimeError(f"expected {expected} questions, parsed {len(result['questions'])}")
+        with tempfile.TemporaryDirectory() as cache_dir:
+            pooled, _ = time_extract(PdfExamExtractor(cache_dir, workers=args.workers), pdf)
+            warm, _ = time_extract(PdfExamExtractor(cache_dir, workers=args.workers), pdf)
+        print(
+            f"{page_count:>6} {len(result['questions']):>9} {serial * 1000:>8.1f}ms "
+            f"{pooled * 1000:>9.1f}ms {warm * 1000:>9.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
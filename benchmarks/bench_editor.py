@@ -0,0 +1,121 @@
+"""
+Measures question-editor rerun times with Streamlit's AppTest.
+
+Usage:
+    python benchmarks/bench_editor.py [--questions 20 100 300] [--repeat 3]
+
+For each exam size the legacy editor (every question rendered in an expander, as Edit
+JSON did before) is compared with show_question_editor at its default page size. "first
+run" renders the page, "edit" types into one question and reruns. AppTest always reruns the
+whole script, so the paginated "edit" time is an upper bound: in the browser an edit only
+reruns the question's fragment.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_QUESTIONS = [20, 100, 300]
+
+
+def legacy_editor():
+    import streamlit as st
+
+    from streamlit_app import parse_options
+
+    questions = st.session_state.bench_questions
+    for i, question in enumerate(questions):
+        with st.expander(f"Question {i + 1}", expanded=False):
+            question['question'] = st.text_area(f"Question Text #{i+1}", question['question'], height=100, key=f"q{i}_text")
+            options_text = st.text_area(
+                "Options (one option per line, max 5 lines)",
+                value="\n".join(question.get('options', {}).values()),
+                height=150,
+                key=f"q{i}_options"
+            )
+            new_options = parse_options(options_text)
+            if new_options != question.get('options', {}):
+                question['options'] = new_options
+            st.write("Parsed Options:")
+            for key, value in question['options'].items():
+                st.text(f"{key}: {value}")
+            correct_answers_input = st.text_input(
+                "Correct Answer(s) (e.g., ABC, DE, A)",
+                value="".join(question.get('correct_answers', [])),
+                key=f"q{i}_correct_input"
+            )
+            new_correct_answers = [ans for ans in correct_answers_input.upper() if ans in question['options']]
+            if new_correct_answers != question.get('correct_answers', []):
+                question['correct_answers'] = new_correct_answers
+                question['isAnswered'] = bool(new_correct_answers)
+            st.write("Parsed Correct Answer(s):")
+            st.text(", ".join(question['correct_answers']))
+
+
+def paginated_editor():
+    import streamlit as st
+
+    from streamlit_app import show_question_editor
+
+    show_question_editor(st.session_state.bench_questions, "edit")
+
+
+def make_questions(count: int) -> list[dict]:
+    return [
+        {
+            "question": f"Question {number} about the brachial plexus and its branches?",
+            "options": {key: f"Option {key} for question {number}" for key in "ABCDE"},
+            "correct_answers": ["A", "C"],
+            "isAnswered": True,
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def time_editor(script, count: int, edit_key: str) -> dict:
+    app = AppTest.from_function(script, default_timeout=120)
+    app.session_state["bench_questions"] = make_questions(count)
+
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    start = time.perf_counter()
+    app.text_area(key=edit_key).input("Edited question text?").run()
+    edit = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    return {"first_run": first_run, "edit": edit, "widgets": len(app.text_area)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, nargs="+", default=DEFAULT_QUESTIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    print(f"{'questions':>9} {'editor':<10} {'text areas':>10} {'first run':>12} {'edit rerun':>12}")
+    for count in args.questions:
+        for name, script, edit_key in (
+            ("legacy", legacy_editor, "q0_text"),
+            ("paginated", paginated_editor, "edit_q0_text"),
+        ):
+            runs = [time_editor(script, count, edit_key) for _ in range(args.repeat)]
+            print(
+                f"{count:>9} {name:<10} {runs[0]['widgets']:>10} "
+                f"{statistics.median(run['first_run'] for run in runs) * 1000:>10.1f}ms "
+                f"{statistics.median(run['edit'] for run in runs) * 1000:>10.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measures LLM structuring throughput against the local stub server.
+
+Usage:
+    python benchmarks/bench_llm_structuring.py [--questions 1000] [--latency 0.2]
+                                               [--concurrency 1 4 8] [--batch-size 20]
+                                               [--fail-every N]
+
+The stub from devtools/llm_stub_server.py runs in-process and answers each request after
+--latency seconds, standing in for model latency. Raw question text is structured once per
+concurrency level with an empty cache, then once more with the cache warm.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR.parent / "devtools"))
+
+from llm_stub_server import make_server  # noqa: E402
+from llm_structuring import LLMStructurer  # noqa: E402
+
+
+def make_raw_text(count: int) -> str:
+    blocks = []
+    for number in range(1, count + 1):
+        options = "\n".join(
+            f"{'*' if letter in 'AC' else ''}{letter}- Proposition {letter} sur le nerf numéro {number}"
+            for letter in "ABCDE"
+        )
+        blocks.append(f"{number}° Concernant le plexus brachial, indiquer la (les)\nproposition(s) exacte(s) :\n{options}")
+    return "Faculté de Médecine\nExamen d'Anatomie\n" + "\n".join(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server, state = make_server(0, args.latency, args.fail_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    raw_text = make_raw_text(args.questions)
+
+    print(f"{'concurrency':>11} {'cache':<5} {'requests':>8} {'seconds':>8} {'questions/s':>12}")
+    try:
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                structurer = LLMStructurer(
+                    base_url=base_url,
+                    cache_dir=cache_dir,
+                    batch_size=args.batch_size,
+                    max_concurrency=concurrency,
+                )
+                for cache in ("cold", "warm"):
+                    requests_before = state.stats()["requests"]
+                    start = time.perf_counter()
+                    result = structurer.structure_exam(raw_text)
+                    elapsed = time.perf_counter() - start
+                    questions = result["exam"]["content"]["questions"]
+                    if result["failed_batches"] or len(questions) != args.questions:
+                        sys.exit(f"structuring failed: {result['failed_batches'][:1]}")
+                    if questions[0]["correct_answers"] != ["A", "C"]:
+                        sys.exit(f"unexpected answers: {questions[0]}")
+                    print(
+                        f"{concurrency:>11} {cache:<5} {state.stats()['requests'] - requests_before:>8} "
+                        f"{elapsed:>8.2f} {args.questions / elapsed:>12,.0f}"
+                    )
+    finally:
+        server.shutdown()
+    print(f"stub: {state.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measures the question structuring stage on synthetic questions.
+
+Usage:
+    python benchmarks/bench_structuring.py [--questions 10000 100000] [--dirty 0.3] [--repeat 3]
+
+Questions come from the synthetic corpus generator. A --dirty share of them gets its
+options written into the stem as "A- ...", "B- ..." lines, as in the bundled sample exam, and
+one in five of those has its correct_answers moved inside options. structure_questions
+must repair exactly those questions. clean_texts on the same questions is timed for scale.
+"""
+
+import argparse
+import copy
+import random
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from clean_directory import MedicalDataCleaner  # noqa: E402
+from synthetic_corpus import _question  # noqa: E402
+
+DEFAULT_QUESTIONS = [10000, 100000]
+
+
+def make_questions(count: int, dirty: float, seed: int = 0) -> tuple[list[dict], int]:
+    rnd = random.Random(seed)
+    questions = []
+    dirty_count = 0
+    for number in range(1, count + 1):
+        question = _question(rnd, number, ["°"])
+        if rnd.random() < dirty:
+            dirty_count += 1
+            inline = "\n".join(f"{key}- {value}" for key, value in question["options"].items())
+            question["question"] = f"{question['question']}\n{inline}"
+            if rnd.random() < 0.5:
+                question["options"] = {}
+            if rnd.random() < 0.2:
+                question["options"]["correct_answers"] = question.pop("correct_answers")
+        questions.append(question)
+    return questions, dirty_count
+
+
+def best_of(repeat: int, questions: list[dict], func):
+    timings = []
+    for _ in range(repeat):
+        batch = copy.deepcopy(questions)
+        start = time.perf_counter()
+        result = func(batch)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, nargs="+", default=DEFAULT_QUESTIONS)
+    parser.add_argument("--dirty", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cleaner = MedicalDataCleaner()
+    print(f"{'questions':>9} {'repaired':>8} {'structure':>11} {'questions/s':>12} {'clean_texts':>12}")
+    for count in args.questions:
+        questions, dirty_count = make_questions(count, args.dirty)
+        structure_time, repaired = best_of(args.repeat, questions, cleaner.structure_questions)
+        if len(repaired) != dirty_count:
+            sys.exit(f"expected {dirty_count} repaired questions, got {len(repaired)}")
+
+        structured = copy.deepcopy(questions)
+        cleaner.structure_questions(structured)
+        clean_time, _ = best_of(
+            args.repeat,
+            structured,
+            lambda batch: cleaner.clean_texts([question["question"] for question in batch], True),
+        )
+        print(
+            f"{count:>9} {len(repaired):>8} {structure_time * 1000:>9.1f}ms "
+            f"{count / structure_time:>12,.0f} {clean_time * 1000:>10.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
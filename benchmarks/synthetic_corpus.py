@@ -0,0 +1,171 @@
+"""
+Generates synthetic exam trees shaped like the Drive export.
+
+Layout: <school>/<semester>/<E1_50Q_FEB22_AOD>/<exam files>. Some exams are split into
+_1/_2 files that the cleaner must merge, files are written as UTF-8, UTF-8 with BOM or
+cp1252, texts carry smart quotes and stray symbols, and Mac-zipped junk (__MACOSX trees
+and ._ resource forks) is sprinkled in.
+"""
+
+import io
+import json
+import random
+import zipfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+WORDS = (
+    "le la les des du une un artère veine nerf muscle os cœur foie rein poumon cellule "
+    "membrane protéine enzyme hormone récepteur glande ganglion plexus tendon ligament "
+    "vertèbre crâne thorax abdomen bassin fémur tibia humérus radius ulna sternum "
+    "innervation vascularisation insertion origine rapport antérieur postérieur latéral "
+    "médial supérieur inférieur profond superficiel est sont dans avec par pour sur"
+).split()
+SMART_FRAGMENTS = ["l’", "d’", "“exact”", "‘faux’", "…", "–", "—"]
+STRAY_SYMBOLS = ["★", "•", "©", "✓", "$", "*", "~", "\U0001F600"]
+QUESTION_PREFIXES = ["{n}. ", "{n}) ", "Q{n} ", "Question {n}: ", "{n}° ", ""]
+OPTION_PREFIXES = ["{k}. ", "{k}) ", "{k}- ", ""]
+ENCODINGS = ["utf-8"] * 6 + ["utf-8-sig"] * 2 + ["cp1252"] * 2
+
+
+def _load_config():
+    with (REPO_ROOT / "curriculum_structure.json").open("r", encoding="utf-8") as f:
+        curriculum = json.load(f)
+    with (REPO_ROOT / "schools.json").open("r", encoding="utf-8") as f:
+        schools = json.load(f)["Schools"]
+    return curriculum, schools
+
+
+def _sentence(rnd, min_words, max_words, symbols):
+    words = [rnd.choice(WORDS) for _ in range(rnd.randint(min_words, max_words))]
+    if rnd.random() < 0.3:
+        words.insert(rnd.randrange(len(words) + 1), rnd.choice(SMART_FRAGMENTS))
+    if rnd.random() < 0.05:
+        words.insert(rnd.randrange(len(words) + 1), rnd.choice(symbols))
+    if rnd.random() < 0.1:
+        words.insert(rnd.randrange(len(words) + 1), " ")
+    return " ".join(words)
+
+
+def _question(rnd, number, symbols):
+    option_count = rnd.choice([4, 5, 5])
+    options = {}
+    for key in "ABCDE"[:option_count]:
+        prefix = rnd.choice(OPTION_PREFIXES).format(k=key)
+        options[key] = prefix + _sentence(rnd, 2, 10, symbols) + rnd.choice(["", "", ".", " ;"])
+    answers = rnd.sample(list(options), rnd.randint(1, 3))
+    if rnd.random() < 0.05:
+        answers.append(answers[0])
+    prefix = rnd.choice(QUESTION_PREFIXES).format(n=number)
+    return {
+        "question": prefix + _sentence(rnd, 6, 30, symbols) + rnd.choice(["?", " :", "", "..."]),
+        "options": options,
+        "correct_answers": answers,
+        "isAnswered": True,
+        "hasImage": False,
+    }
+
+
+def _encodable_symbols(encoding):
+    symbols = []
+    for symbol in STRAY_SYMBOLS:
+        try:
+            symbol.encode(encoding)
+        except UnicodeEncodeError:
+            continue
+        symbols.append(symbol)
+    return symbols
+
+
+def generate_corpus(root, question_count: int, seed: int = 0, questions_per_exam: int = 50):
+    """
+    Writes exams under root until question_count questions exist.
+    Returns a summary with the number of exams, JSON files and questions written.
+    """
+    rnd = random.Random(seed)
+    curriculum, schools = _load_config()
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    exam_count = 0
+    file_count = 0
+    written_questions = 0
+    encodings = {}
+
+    while written_questions < question_count:
+        size = min(question_count - written_questions, rnd.randint(questions_per_exam // 2, questions_per_exam * 2))
+        school = rnd.choice(schools)
+        subject_year = rnd.choice(list(curriculum))
+        semester = rnd.choice(list(curriculum[subject_year]))
+        topic = rnd.choice(curriculum[subject_year][semester])
+        month_index = rnd.randrange(12)
+        year = rnd.randint(2015, 2024)
+        exam_variable = rnd.randint(1, 5)
+        answer_mode = rnd.choice(["AOD", "AOD", "AA"])
+        folder_name = f"E{exam_variable}_{size}Q_{MONTHS[month_index]}{year % 100:02d}_{answer_mode}"
+        exam_dir = root / school / semester / folder_name
+        if exam_dir.exists():
+            continue
+        exam_dir.mkdir(parents=True)
+
+        exam_year = rnd.choices([year, "UNK", str(year % 100), "20XX"], weights=[90, 6, 3, 1])[0]
+        metadata = {
+            "unique_id": f"{semester}_{school}_{topic}_{year}_{MONTH_NAMES[month_index]}_{exam_variable}".replace(" ", "_"),
+            "school": school,
+            "exam_year": exam_year,
+            "exam_month": MONTH_NAMES[month_index],
+            "exam_variable": exam_variable,
+            "subject_year": subject_year,
+            "semester": semester,
+            "topic": topic,
+        }
+        encoding = rnd.choice(ENCODINGS)
+        symbols = _encodable_symbols(encoding)
+        questions = [_question(rnd, number, symbols) for number in range(1, size + 1)]
+
+        parts = 1 if size < 10 or rnd.random() < 0.7 else rnd.choice([2, 2, 3])
+        bounds = [round(size * part / parts) for part in range(parts + 1)]
+        for part in range(parts):
+            suffix = f"_{part + 1}" if parts > 1 else ""
+            data = {
+                "metadata": metadata,
+                "content": {"questions": questions[bounds[part]:bounds[part + 1]]},
+            }
+            raw = json.dumps(data, ensure_ascii=False, indent=2).encode(encoding)
+            (exam_dir / f"{folder_name}{suffix}.json").write_bytes(raw)
+            encodings[encoding] = encodings.get(encoding, 0) + 1
+            file_count += 1
+
+        if rnd.random() < 0.2:
+            junk_dir = root / "__MACOSX" / school / semester / folder_name
+            junk_dir.mkdir(parents=True, exist_ok=True)
+            (junk_dir / f"._{folder_name}.json").write_bytes(b"\x00\x05\x16\x07" + bytes(60))
+            (exam_dir / f"._{folder_name}.json").write_bytes(b"\x00\x05\x16\x07" + bytes(60))
+
+        exam_count += 1
+        written_questions += size
+
+    return {
+        "root": str(root),
+        "exams": exam_count,
+        "json_files": file_count,
+        "questions": written_questions,
+        "encodings": encodings,
+    }
+
+
+def zip_directory(root) -> bytes:
+    """Packs a generated tree the way a browser upload of a zipped Drive folder arrives."""
+    root = Path(root)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for file_path in sorted(root.rglob("*")):
+            if file_path.is_file():
+                archive.write(file_path, arcname=str(Path(root.name) / file_path.relative_to(root)))
+    return buffer.getvalue()
@@ -0,0 +1,226 @@
+"""
+Bulk publishing of cleaned exams to Google Drive and the "Metadata" sheet.
+
+Files are uploaded on a bounded thread pool and their metadata rows are appended to the
+sheet in a few large appends once the uploads are done. Every upload and every appended
+chunk is recorded in a JSONL progress journal, so a run that stops half-way can be started
+again and only does the remaining work. There is one journal per destination (Drive folder
+and sheet), kept outside the cleaned output, so publishing a re-cleaned corpus only uploads
+the exams whose content changed.
+"""
+
+import hashlib
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+
+from googleapiclient.http import MediaInMemoryUpload
+
+from clean_directory import iter_directory_exams
+
+METADATA_RANGE = "Metadata!A1:K"
+DEFAULT_WORKERS = 8
+DEFAULT_CHUNK_SIZE = 500
+
+
+def metadata_row(exam_data: dict, timestamp: str | None = None) -> list:
+    """Builds the "Metadata" sheet row (columns A to K) for one exam."""
+    metadata = exam_data.get("metadata", {})
+    questions = exam_data.get("content", {}).get("questions", [])
+    if timestamp is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    return [
+        timestamp,                                  # A
+        str(metadata.get("unique_id", "")),         # B
+        str(metadata.get("school", "")),            # C
+        str(metadata.get("exam_year", "")),         # D
+        str(metadata.get("exam_month", "")),        # E
+        str(metadata.get("exam_variable", "")),     # F
+        str(metadata.get("subject_year", "")),      # G
+        str(metadata.get("semester", "")),          # H
+        str(metadata.get("topic", "")),             # I
+        len(questions),                             # J
+        json.dumps(metadata),                       # K (entire metadata as JSON)
+    ]
+
+
+def upload_json(clients, folder_id: str, json_bytes: bytes, filename: str) -> dict:
+    """Uploads one JSON document to the Drive folder and returns its id and webViewLink."""
+    media = MediaInMemoryUpload(json_bytes, mimetype="application/json")
+    return clients.execute(
+        clients.drive.files().create(
+            body={"name": filename, "parents": [folder_id]},
+            media_body=media,
+            fields="id, webViewLink",
+        )
+    )
+
+
+def append_rows(clients, spreadsheet_id: str, rows: list) -> dict:
+    return clients.execute(
+        clients.sheets.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=METADATA_RANGE,
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows},
+        )
+    )
+
+
+class PublishJournal:
+    """
+    Append-only JSONL record of a publish run.
+    "uploaded" entries hold the Drive file and the sheet row of one exam (keyed by its
+    relative path and content hash), "appended" entries list the exams whose rows are in
+    the sheet.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.uploaded = {}
+        self.appended = set()
+        if self.path.is_file():
+            with self.path.open("r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry["event"] == "uploaded":
+                        self.uploaded[entry["file"]] = entry
+                        self.appended.discard(entry["file"])
+                    elif entry["event"] == "appended":
+                        self.appended.update(entry["files"])
+
+    def _write(self, entry: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def is_uploaded(self, rel_path: str, sha256: str) -> bool:
+        entry = self.uploaded.get(rel_path)
+        return entry is not None and entry["sha256"] == sha256
+
+    def record_upload(self, rel_path: str, sha256: str, drive_file: dict, row: list):
+        entry = {
+            "event": "uploaded",
+            "file": rel_path,
+            "sha256": sha256,
+            "id": drive_file.get("id"),
+            "webViewLink": drive_file.get("webViewLink"),
+            "row": row,
+        }
+        self._write(entry)
+        self.uploaded[rel_path] = entry
+        self.appended.discard(rel_path)
+
+    def record_appended(self, rel_paths: list[str]):
+        self._write({"event": "appended", "files": rel_paths})
+        self.appended.update(rel_paths)
+
+
+def publish_exams(
+    exams,
+    clients,
+    folder_id: str,
+    spreadsheet_id: str,
+    journal_path,
+    workers: int = DEFAULT_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress=None,
+) -> dict:
+    """
+    Uploads exams, given as (relative path, load) pairs, and appends their metadata rows.
+    Exams already uploaded with the same content are skipped and rows already appended are
+    not appended again. Upload errors are collected per file; an append error stops the
+    run, and the next run resumes from the journal. progress(done, total) is called after
+    every upload.
+    """
+    journal = PublishJournal(journal_path)
+    exams = list(exams)
+    order = {rel_path: index for index, (rel_path, _load) in enumerate(exams)}
+
+    def upload(rel_path, load):
+        raw = load()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if journal.is_uploaded(rel_path, sha256):
+            return rel_path, sha256, None, None
+        exam_data = json.loads(raw)
+        unique_id = exam_data.get("metadata", {}).get("unique_id")
+        filename = f"{unique_id}.json" if unique_id else PurePosixPath(rel_path).name
+        return rel_path, sha256, upload_json(clients, folder_id, raw, filename), metadata_row(exam_data)
+
+    uploaded = 0
+    skipped = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(upload, rel_path, load): rel_path for rel_path, load in exams}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                rel_path, sha256, drive_file, row = future.result()
+            except Exception as exc:
+                failed.append({"file": futures[future], "error": str(exc)})
+            else:
+                if drive_file is None:
+                    skipped += 1
+                else:
+                    journal.record_upload(rel_path, sha256, drive_file, row)
+                    uploaded += 1
+            if progress is not None:
+                progress(done, len(futures))
+
+    to_append = sorted(
+        (
+            rel_path
+            for rel_path in journal.uploaded
+            if rel_path in order and rel_path not in journal.appended
+        ),
+        key=order.get,
+    )
+    appended_rows = 0
+    append_error = None
+    for start in range(0, len(to_append), chunk_size):
+        chunk = to_append[start:start + chunk_size]
+        rows = [journal.uploaded[rel_path]["row"] for rel_path in chunk]
+        try:
+            append_rows(clients, spreadsheet_id, rows)
+        except Exception as exc:
+            append_error = str(exc)
+            break
+        journal.record_appended(chunk)
+        appended_rows += len(chunk)
+
+    return {
+        "total_files": len(order),
+        "uploaded_files": uploaded,
+        "skipped_files": skipped,
+        "appended_rows": appended_rows,
+        "failed_files": sorted(failed, key=lambda entry: order[entry["file"]]),
+        "append_error": append_error,
+        "journal": str(journal.path),
+    }
+
+
+def journal_path_for(folder_id: str, spreadsheet_id: str, journal_dir=None) -> Path:
+    """The publish journal of one Drive folder and sheet, under journal_dir (default: the temp dir)."""
+    journal_dir = Path(journal_dir) if journal_dir is not None else Path(tempfile.gettempdir()) / "medquest_publish"
+    destination = hashlib.sha256(f"{folder_id}\n{spreadsheet_id}".encode("utf-8")).hexdigest()[:16]
+    return journal_dir / f"{destination}.jsonl"
+
+
+def publish_cleaned_directory(
+    result, clients, folder_id: str, spreadsheet_id: str, journal_path=None, **options
+) -> dict:
+    """
+    Publishes the output of MedicalDataCleaner.process_directory (its result dict or the
+    output directory). The journal defaults to journal_path_for(folder_id, spreadsheet_id).
+    """
+    output_dir = Path(result["output_dir"] if isinstance(result, dict) else result)
+    if journal_path is None:
+        journal_path = journal_path_for(folder_id, spreadsheet_id)
+    return publish_exams(
+        iter_directory_exams(output_dir), clients, folder_id, spreadsheet_id, journal_path, **options
+    )
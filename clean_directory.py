@@ -1,17 +1,95 @@
+import codecs
+import hashlib
 import json
+import os
 import re
 import shutil
+import tempfile
+import time
+import zipfile
 from collections import defaultdict
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from near_duplicates import collapse_near_duplicates, find_near_duplicates, format_clusters
+from pipeline_timing import PipelineTimer
+
+try:
+    import orjson
+except ImportError:  # optional, faster JSON parsing
+    orjson = None
+
+
+CLEANER_VERSION = "4"
+TIMINGS_NAME = "timings.json"
+MANIFEST_NAME = ".clean_manifest.json"
+
+# Characters of the "trailing" pattern's class; texts that don't end with one skip the regex.
+TRAILING_PUNCTUATION = (".", ":", ";", "?", "…")
+OPTION_LETTERS = "ABCDE"
+
+_WORKER_CLEANER = None
+
+
+def default_json_loads():
+    """Returns orjson.loads when orjson is installed, otherwise json.loads."""
+    return orjson.loads if orjson is not None else json.loads
+
+
+def _init_group_worker(cleaner):
+    global _WORKER_CLEANER
+    _WORKER_CLEANER = cleaner
+
+
+def _clean_group_in_worker(args):
+    return _WORKER_CLEANER._clean_group(*args)
+
+
+def _always_match(_text):
+    return True
+
+
+def iter_directory_exams(output_dir):
+    """Yields (relative path, load) for every cleaned JSON under output_dir, in path order."""
+    output_dir = Path(output_dir)
+    for file_path in sorted(output_dir.rglob("*.json")):
+        if file_path.name == MANIFEST_NAME:
+            continue
+        yield file_path.relative_to(output_dir).as_posix(), file_path.read_bytes
+
+
+def iter_archive_exams(archive: zipfile.ZipFile, prefix: str = "cleaned"):
+    """
+    Yields (relative path, load) for the cleaned members of an open process_zip archive.
+    The caller owns the archive and keeps it open until every load has been called.
+    """
+    root = PurePosixPath(prefix)
+    for name in sorted(archive.namelist()):
+        member = PurePosixPath(name)
+        if member.suffix != ".json" or root not in member.parents:
+            continue
+        yield member.relative_to(root).as_posix(), lambda name=name: archive.read(name)
+
+
+def archive_prefix(archive: zipfile.ZipFile) -> str:
+    """"cleaned" for process_zip archives, otherwise the archive root."""
+    if any(name.startswith("cleaned/") and name.endswith(".json") for name in archive.namelist()):
+        return "cleaned"
+    return ""
 
 
 class MedicalDataCleaner:
     """
     Cleans JSON exam folders from any source directory into a chosen output directory.
-    Never modifies the source files.
+    Never modifies the source files. structure=False skips the structure_questions stage.
     """
 
-    def __init__(self):
+    def __init__(self, json_loads=None, stage_hook=None, slowest_files: int = 10, structure: bool = True):
+        self.json_loads = json_loads or default_json_loads()
+        self.structure = structure
+        self.stage_hook = stage_hook
+        self.slowest_files = slowest_files
+        self.timer = PipelineTimer(slowest_files, stage_hook)
         self.smart_map = {
             "\u2019": "'",
             "\u2018": "'",
@@ -26,6 +104,7 @@ class MedicalDataCleaner:
             "split_file": re.compile(r"^(.*?)(?:_\d+)?(?:\s.*)?\.json$"),
             "q_prefix": re.compile(r"^\s*(?:Question\s*\d+|Q\.?\s*\d+|\d+[\.:)])\s*", re.I),
             "o_prefix": re.compile(r"^\s*[A-E][\.:)]\s*", re.I),
+            "inline_option": re.compile(r"(?:^|\n)\s*([A-E])\s*[-–)]\s*"),
             "trailing": re.compile(r"[\.:;?…]+\s*$"),
             "multi_sp": re.compile(r"\s{2,}"),
             "invalid": re.compile(
@@ -34,13 +113,21 @@ class MedicalDataCleaner:
             ),
         }
 
+        self.compile_rules()
         self.reset_logs()
 
+    def compile_rules(self):
+        """Caches lookups derived from smart_map and self.p; call again after changing them."""
+        self._smart_items = tuple(self.smart_map.items())
+        self._smart_keys_invalid = all(self.p["invalid"].match(old) for old in self.smart_map)
+
     def reset_logs(self):
         self.invalid_years = []
         self.duplicate_answers = []
+        self.repaired_questions = []
         self.merged_counts = {}
         self.stripped_chars = defaultdict(int)
+        self.encodings = {}
 
     def should_ignore_json_file(self, file_path: Path, root_dir: Path | None = None) -> bool:
         path_parts = file_path.parts if root_dir is None else file_path.relative_to(root_dir).parts
@@ -49,107 +136,302 @@ class MedicalDataCleaner:
         return file_path.name.startswith("._")
 
     def iter_json_files(self, root_dir: Path):
-        for file_path in root_dir.rglob("*.json"):
-            if self.should_ignore_json_file(file_path, root_dir):
-                continue
-            yield file_path
+        for rel_path, _entry in self.iter_json_entries(root_dir):
+            yield root_dir / rel_path
+
+    def iter_json_entries(self, root_dir: Path, workers: int = 1):
+        """
+        Walks root_dir with os.scandir and yields (relative path, DirEntry) for every JSON
+        file, in the order rglob("*.json") would. __MACOSX trees are pruned before they are
+        entered, ._ resource forks are skipped and symlinked directories are not followed.
+        With workers > 1 directories are scanned ahead on a thread pool, which pays off on
+        network mounts where every scandir call waits on the server.
+        """
+        root_scan = (os.fspath(root_dir), Path())
+        if workers <= 1:
+            pending = [root_scan]
+            while pending:
+                files, subdirs = self._scan_directory(*pending.pop())
+                yield from files
+                pending.extend(reversed(subdirs))
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = [executor.submit(self._scan_directory, *root_scan)]
+            while pending:
+                files, subdirs = pending.pop().result()
+                pending.extend(
+                    reversed([executor.submit(self._scan_directory, *subdir) for subdir in subdirs])
+                )
+                yield from files
+
+    def _scan_directory(self, directory: str, rel_dir: Path):
+        files, subdirs = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if name != "__MACOSX":
+                        subdirs.append((entry.path, rel_dir / name))
+                elif name.endswith(".json") and not name.startswith("._") and not entry.is_dir():
+                    files.append((rel_dir / name, entry))
+        return files, subdirs
 
     def clean_text(self, txt: str, is_q: bool) -> str:
-        s = txt.strip()
-        for old, new in self.smart_map.items():
-            s = s.replace(old, new)
-        s = self.p["q_prefix"].sub("", s) if is_q else self.p["o_prefix"].sub("", s)
-        for ch in self.p["invalid"].findall(s):
-            self.stripped_chars[ch] += 1
-        s = self.p["invalid"].sub("", s)
-        s = self.p["trailing"].sub("", s)
-        s = self.p["multi_sp"].sub(" ", s).strip()
-        if s and s[0].isalpha() and s[0].islower():
-            s = s[0].upper() + s[1:]
-        return s
+        return self.clean_texts((txt,), is_q)[0]
+
+    def clean_texts(self, texts, is_q: bool) -> list[str]:
+        """
+        Cleans a batch of question (is_q=True) or option texts.
+        The invalid pattern also matches every smart_map key, so one search decides whether
+        a text needs the smart-quote and removal passes; stripped characters are counted
+        from the same findall that decides whether removal is needed.
+        """
+        smart_items = self._smart_items
+        prefix_sub = self.p["q_prefix"].sub if is_q else self.p["o_prefix"].sub
+        invalid = self.p["invalid"]
+        invalid_search = invalid.search
+        invalid_findall = invalid.findall
+        if not self._smart_keys_invalid:
+            invalid_search = _always_match
+        trailing_sub = self.p["trailing"].sub
+        multi_sp_sub = self.p["multi_sp"].sub
+        stripped_chars = self.stripped_chars
+
+        cleaned = []
+        for txt in texts:
+            s = txt.strip()
+            if invalid_search(s) is None:
+                s = prefix_sub("", s)
+            else:
+                for old, new in smart_items:
+                    s = s.replace(old, new)
+                s = prefix_sub("", s)
+                found = invalid_findall(s)
+                if found:
+                    for ch in found:
+                        stripped_chars[ch] += 1
+                    s = invalid.sub("", s)
+            if s.rstrip().endswith(TRAILING_PUNCTUATION):
+                s = trailing_sub("", s)
+            s = multi_sp_sub(" ", s).strip()
+            if s and s[0].isalpha() and s[0].islower():
+                s = s[0].upper() + s[1:]
+            cleaned.append(s)
+        return cleaned
+
+    def structure_questions(self, questions) -> list[dict]:
+        """
+        Repairs the structure of a batch of questions in place and returns one entry per
+        repaired question. For each question, a single scan of the stem finds inline options
+        at line starts ("A- ...", "B) ...", in order, at least two); the stem is cut before
+        them and they fill the letters missing from the options dict (existing options win,
+        differing ones are reported). Markers inside a line ("hépatites A - B - C") are
+        prose, and a stem whose inline values all differ from existing options is left
+        alone. A correct_answers list found inside options moves to the question.
+        """
+        # Markers only count at line starts, so single-line stems skip the regex.
+        finditer = self.p["inline_option"].finditer
+        repaired = []
+
+        for idx, question in enumerate(questions):
+            repairs = []
+            entry = {}
+            options = question.get("options")
+            if not isinstance(options, dict):
+                options = {}
+
+            misplaced = options.pop("correct_answers", None)
+            if misplaced is not None:
+                misplaced = misplaced if isinstance(misplaced, list) else [misplaced]
+                current = question.get("correct_answers") or []
+                if not current:
+                    question["correct_answers"] = misplaced
+                elif current != misplaced:
+                    entry["discarded_answers"] = misplaced
+                repairs.append("moved_correct_answers")
+
+            text = question.get("question", "")
+            if isinstance(text, str) and "\n" in text:
+                markers = []
+                for match in finditer(text):
+                    if match.group(1) == OPTION_LETTERS[len(markers)]:
+                        markers.append(match)
+                        if len(markers) == len(OPTION_LETTERS):
+                            break
+                stem = text[: markers[0].start()].rstrip() if markers else ""
+                if len(markers) >= 2 and stem:
+                    ends = [match.start() for match in markers[1:]] + [len(text)]
+                    values = {match.group(1): text[match.end():end].strip() for match, end in zip(markers, ends)}
+                    filled = [letter for letter in values if not options.get(letter)]
+                    conflicts = [
+                        letter
+                        for letter in values
+                        if options.get(letter)
+                        and " ".join(options[letter].split()).casefold() != " ".join(values[letter].split()).casefold()
+                    ]
+                    if len(conflicts) < len(values):
+                        for letter in filled:
+                            options[letter] = values[letter]
+                        question["question"] = stem
+                        question["options"] = options
+                        repairs.append("split_stem")
+                        if filled:
+                            entry["filled_options"] = filled
+                        if conflicts:
+                            entry["option_conflicts"] = conflicts
+
+            if repairs:
+                repaired.append({"question_index": idx, "repairs": repairs, **entry})
+        return repaired
 
     def read_json_file(self, file_path: Path):
-        raw = file_path.read_bytes()
-        attempted_encodings = []
+        data, _encoding = self.decode_json_bytes(file_path.read_bytes(), file_path.name)
+        return data
 
-        for encoding in ("utf-8", "utf-8-sig", "cp1252", "latin-1"):
-            attempted_encodings.append(encoding)
+    def detect_encoding(self, raw: bytes) -> tuple[str, str]:
+        """
+        Decodes raw bytes with the first encoding that fits: a UTF-8 BOM, strict UTF-8,
+        cp1252, then latin-1 (which accepts anything). Returns the text and the encoding.
+        """
+        body = raw
+        if raw.startswith(codecs.BOM_UTF8):
+            body = raw[len(codecs.BOM_UTF8):]
             try:
-                return json.loads(raw.decode(encoding))
+                return body.decode("utf-8"), "utf-8-sig"
             except UnicodeDecodeError:
-                continue
-            except json.JSONDecodeError:
-                continue
+                pass
+        else:
+            try:
+                return body.decode("utf-8"), "utf-8"
+            except UnicodeDecodeError:
+                pass
 
-        tried = ", ".join(attempted_encodings)
-        raise ValueError(
-            f"Could not decode JSON file {file_path.name} using encodings: {tried}"
-        )
+        try:
+            return body.decode("cp1252"), "cp1252"
+        except UnicodeDecodeError:
+            return body.decode("latin-1"), "latin-1"
 
-    def process_directory(
-        self,
-        root_dir: str | Path,
-        output_dir: str | Path | None = None,
-        reports_dir: str | Path | None = None,
-        clear_output: bool = True,
-    ):
-        self.reset_logs()
+    def decode_json_bytes(self, raw: bytes, name: str):
+        """Detects the encoding of raw, parses it once and returns (data, encoding)."""
+        text, encoding = self.detect_encoding(raw)
+        try:
+            return self.json_loads(text), encoding
+        except ValueError as exc:
+            if self.json_loads is not json.loads:
+                # Faster backends are stricter than json (NaN, huge integers); let it decide.
+                try:
+                    return json.loads(text), encoding
+                except ValueError:
+                    pass
+            raise ValueError(
+                f"Could not parse JSON file {name} (detected encoding: {encoding}): {exc}"
+            ) from exc
 
-        src = Path(root_dir)
-        if not src.exists():
-            raise FileNotFoundError(f"Source directory does not exist: {src}")
+    def _clean_group(self, src: Path, dst: Path, dest_rel: Path, files: list[Path]):
+        """
+        Merges, cleans and writes a single output group.
+        Returns the group's own log entries and timings so serial and parallel runs merge
+        them the same way.
+        """
+        timer = self._group_timer()
+        group_start = time.perf_counter()
 
-        dst = Path(output_dir) if output_dir is not None else Path.cwd() / "Medquestions_fixed"
-        reports_root = Path(reports_dir) if reports_dir is not None else Path.cwd()
+        files = self._sort_group(dest_rel, files)
+        with timer.stage("read"):
+            raw_sources = [(rel_path, (src / rel_path).read_bytes()) for rel_path in files]
+        output_text, group_result = self._clean_group_sources(dest_rel, raw_sources, timer)
+        if output_text is None:
+            return None
 
-        if clear_output and dst.exists():
-            shutil.rmtree(dst)
-        dst.mkdir(parents=True, exist_ok=True)
-        reports_root.mkdir(parents=True, exist_ok=True)
+        with timer.stage("write"):
+            output_path = dst / dest_rel
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_text(output_text, encoding="utf-8")
 
-        groups = defaultdict(list)
-        for file_path in self.iter_json_files(src):
-            rel = file_path.relative_to(src)
-            match = self.p["split_file"].match(rel.name)
-            base = (match.group(1) if match else rel.stem) + ".json"
-            groups[rel.parent / base].append(file_path)
+        timer.record_file(str(dest_rel), time.perf_counter() - group_start)
+        group_result["timings"] = timer.to_dict()
+        return group_result
 
-        cleaned_file_count = 0
-        cleaned_question_count = 0
+    def _group_timer(self) -> PipelineTimer:
+        # Group timings are merged into self.timer, which forwards them to stage_hook.
+        return PipelineTimer(self.slowest_files)
+
+    def __getstate__(self):
+        # Worker processes report their timings back instead of calling the hook.
+        state = dict(self.__dict__)
+        state["stage_hook"] = None
+        state["timer"] = None
+        return state
+
+    def _clean_group_sources(self, dest_rel, raw_sources, timer: PipelineTimer):
+        """
+        Decodes, merges, cleans and serializes one group given as (relative path, raw bytes)
+        pairs. Returns the output text and the group's log entries.
+        """
+        with timer.stage("decode"):
+            sources = [(rel, *self.decode_json_bytes(raw, rel.name)) for rel, raw in raw_sources]
+        merged, group_result = self._clean_group_data(dest_rel, sources, timer)
+        if merged is None:
+            return None, None
+        with timer.stage("serialize"):
+            output_text = self.serialize(merged)
+        return output_text, group_result
+
+    def _sort_group(self, dest_rel, files):
+        return sorted(files, key=lambda path: (path.name != dest_rel.name, path.name))
+
+    def serialize(self, data) -> str:
+        return json.dumps(data, ensure_ascii=False, indent=2)
 
-        for dest_rel, files in groups.items():
-            files = sorted(files, key=lambda path: (path.name != dest_rel.name, path.name))
-            merged = None
+    def _clean_group_data(self, dest_rel, sources, timer: PipelineTimer | None = None):
+        """
+        Merges and cleans the decoded sources of one group, given as (relative path, data,
+        encoding) triples with the primary file first. Returns the merged exam and the group's log entries.
+        """
+        self.reset_logs()
+        timer = timer or self._group_timer()
+
+        merged = None
+        source_count = 0
 
-            for file_path in files:
-                data = self.read_json_file(file_path)
+        with timer.stage("merge"):
+            for rel_path, data, encoding in sources:
+                source_count += 1
+                self.encodings[str(rel_path)] = encoding
                 if merged is None:
                     metadata = data.get("metadata", {}) or {}
                     year = str(metadata.get("exam_year", "")).strip()
                     if year.upper() not in ("UNK", "UNKNOWN") and (
                         not year.isdigit() or not 1900 < int(year) < 2100
                     ):
-                        self.invalid_years.append(
-                            {"file": str(file_path.relative_to(src)), "year": year}
-                        )
+                        self.invalid_years.append({"file": str(rel_path), "year": year})
                     merged = {"metadata": metadata, "content": {"questions": []}}
                 merged["content"]["questions"].extend(data["content"]["questions"])
 
-            if merged is None:
-                continue
+        if merged is None:
+            return None, None
 
-            if len(files) > 1:
-                self.merged_counts[str(dest_rel)] = len(files)
+        if source_count > 1:
+            self.merged_counts[str(dest_rel)] = source_count
 
-            exam_var = dest_rel.stem.split("_")[-1]
-            if exam_var.isdigit():
-                merged["metadata"]["exam_variable"] = int(exam_var)
+        exam_var = dest_rel.stem.split("_")[-1]
+        if exam_var.isdigit():
+            merged["metadata"]["exam_variable"] = int(exam_var)
 
+        if self.structure:
+            with timer.stage("structure"):
+                repaired = self.structure_questions(merged["content"]["questions"])
+                if repaired:
+                    self.repaired_questions.append(
+                        {"file": str(dest_rel), "repaired": len(repaired), "questions": repaired}
+                    )
+
+        with timer.stage("clean"):
             for idx, question in enumerate(merged["content"]["questions"]):
                 question["question"] = self.clean_text(question.get("question", ""), True)
                 options = question.get("options", {})
-                for key, value in options.items():
-                    options[key] = self.clean_text(value, False)
+                options.update(zip(options, self.clean_texts(options.values(), False)))
 
                 original_answers = question.get("correct_answers", [])
                 seen, unique_answers, duplicates = set(), [], []
@@ -171,15 +453,469 @@ class MedicalDataCleaner:
                     )
                 question["correct_answers"] = unique_answers
 
-            output_path = dst / dest_rel
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            output_path.write_text(
-                json.dumps(merged, ensure_ascii=False, indent=2),
-                encoding="utf-8",
+        return merged, {
+            "questions": len(merged["content"]["questions"]),
+            "invalid_years": self.invalid_years,
+            "duplicate_answers": self.duplicate_answers,
+            "repaired_questions": self.repaired_questions,
+            "merged_counts": self.merged_counts,
+            "stripped_chars": dict(self.stripped_chars),
+            "encodings": self.encodings,
+        }
+
+    def _clean_groups_parallel(self, src: Path, dst: Path, group_items, workers: int):
+        """
+        Cleans groups across a process pool.
+        Results are yielded in group order so the merged logs match a serial run.
+        """
+        chunksize = max(1, len(group_items) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_group_worker,
+            initargs=(self,),
+        ) as executor:
+            yield from executor.map(
+                _clean_group_in_worker,
+                [(src, dst, dest_rel, files) for dest_rel, files in group_items],
+                chunksize=chunksize,
             )
+
+    def rules_hash(self, collapse_duplicates: bool = False) -> str:
+        """
+        Hash of everything that shapes a cleaned file. collapse_duplicates is part of it
+        because collapsing writes canonical_question_id into the outputs.
+        """
+        rules = {
+            "smart_map": self.smart_map,
+            "patterns": {name: [pattern.pattern, pattern.flags] for name, pattern in self.p.items()},
+            "structure": self.structure,
+            "collapse_duplicates": collapse_duplicates,
+        }
+        encoded = json.dumps(rules, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _hash_sources(self, src: Path, files: list[Path]) -> dict:
+        return {
+            rel_path.as_posix(): hashlib.sha256((src / rel_path).read_bytes()).hexdigest()
+            for rel_path in sorted(files)
+        }
+
+    def _load_manifest(self, dst: Path) -> dict:
+        manifest_path = dst / MANIFEST_NAME
+        if not manifest_path.is_file():
+            return {}
+        try:
+            return json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, dst: Path, groups: dict, collapse_duplicates: bool = False):
+        manifest = {
+            "cleaner_version": CLEANER_VERSION,
+            "rules_hash": self.rules_hash(collapse_duplicates),
+            "groups": groups,
+        }
+        (dst / MANIFEST_NAME).write_text(
+            json.dumps(manifest, ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+    def _remove_output(self, dst: Path, dest_rel: Path):
+        output_path = dst / dest_rel
+        if output_path.is_file():
+            output_path.unlink()
+        parent = output_path.parent
+        while parent != dst and parent.is_dir() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+    def process_directory(
+        self,
+        root_dir: str | Path,
+        output_dir: str | Path | None = None,
+        reports_dir: str | Path | None = None,
+        clear_output: bool = True,
+        workers: int | None = 1,
+        incremental: bool = False,
+        stream_reports: bool = False,
+        detect_near_duplicates: bool = False,
+        collapse_duplicates: bool = False,
+        scan_workers: int = 1,
+        progress=None,
+    ):
+        """
+        Cleans every JSON group under root_dir into output_dir and writes the reports.
+        With stream_reports=True the reports are written as JSONL while groups are processed
+        and the result only carries counts and report paths, so memory stays flat however
+        large the corpus is (the incremental manifest still holds one entry per group).
+        detect_near_duplicates adds a near_duplicates report of question clusters found over
+        the cleaned output; collapse_duplicates also links each duplicate to its canonical
+        question through a canonical_question_id field.
+        Stage timings and the slowest files are returned under "timings" and written to
+        timings.json next to the reports. scan_workers > 1 discovers files on a thread pool,
+        for large trees on network mounts. progress(stage, files done, total files) is called
+        when a stage starts and after every cleaned group.
+        """
+        self.reset_logs()
+        self.timer = PipelineTimer(self.slowest_files, self.stage_hook)
+        run_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        src = Path(root_dir)
+        if not src.exists():
+            raise FileNotFoundError(f"Source directory does not exist: {src}")
+
+        dst = Path(output_dir) if output_dir is not None else Path.cwd() / "Medquestions_fixed"
+        reports_root = Path(reports_dir) if reports_dir is not None else Path.cwd()
+
+        if clear_output and not incremental and dst.exists():
+            shutil.rmtree(dst)
+        dst.mkdir(parents=True, exist_ok=True)
+        reports_root.mkdir(parents=True, exist_ok=True)
+
+        groups = defaultdict(list)
+        if progress is not None:
+            progress("discover", 0, 0)
+        with self.timer.stage("discover"):
+            for rel, _entry in self.iter_json_entries(src, scan_workers):
+                match = self.p["split_file"].match(rel.name)
+                base = (match.group(1) if match else rel.stem) + ".json"
+                groups[rel.parent / base].append(rel)
+
+        group_items = list(groups.items())
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        pending = list(range(len(group_items)))
+
+        if incremental:
+            group_results = [None] * len(group_items)
+            manifest = self._load_manifest(dst)
+            previous_groups = manifest.get("groups", {})
+            reusable = (
+                previous_groups
+                if manifest.get("cleaner_version") == CLEANER_VERSION
+                and manifest.get("rules_hash") == self.rules_hash(collapse_duplicates)
+                else {}
+            )
+            with self.timer.stage("hash_sources"):
+                group_sources = [self._hash_sources(src, files) for _, files in group_items]
+            pending = []
+            for index, (dest_rel, _files) in enumerate(group_items):
+                cached = reusable.get(str(dest_rel))
+                if (
+                    cached is not None
+                    and cached["sources"] == group_sources[index]
+                    and (dst / dest_rel).is_file()
+                ):
+                    group_results[index] = cached["result"]
+                else:
+                    pending.append(index)
+
+        pending_items = [group_items[index] for index in pending]
+        if workers > 1 and len(pending_items) > 1:
+            fresh_results = self._clean_groups_parallel(src, dst, pending_items, workers)
+        else:
+            fresh_results = (
+                self._clean_group(src, dst, dest_rel, files) for dest_rel, files in pending_items
+            )
+        if progress is not None:
+            fresh_results = self._track_progress(
+                fresh_results, [len(files) for _dest_rel, files in pending_items], progress
+            )
+
+        removed_outputs = []
+        if incremental:
+            for index, group_result in zip(pending, fresh_results):
+                group_results[index] = group_result
+
+            current_groups = {str(dest_rel) for dest_rel, _files in group_items}
+            for dest_name in previous_groups:
+                if dest_name not in current_groups:
+                    self._remove_output(dst, Path(dest_name))
+                    removed_outputs.append(dest_name)
+
+            self._write_manifest(
+                dst,
+                {
+                    str(dest_rel): {
+                        "sources": group_sources[index],
+                        "result": {
+                            key: value
+                            for key, value in group_results[index].items()
+                            if key != "timings"
+                        },
+                    }
+                    for index, (dest_rel, _files) in enumerate(group_items)
+                    if group_results[index] is not None
+                },
+                collapse_duplicates,
+            )
+        else:
+            group_results = fresh_results
+
+        report_writer = StreamingReportWriter(reports_root) if stream_reports else None
+        cleaned_file_count, cleaned_question_count = self._collect_group_results(
+            group_results, report_writer
+        )
+        if progress is not None:
+            pending_file_count = sum(len(files) for _dest_rel, files in pending_items)
+            progress("reports", pending_file_count, pending_file_count)
+        with self.timer.stage("reports"):
+            if report_writer is not None:
+                reports = {name: str(path) for name, path in report_writer.close().items()}
+            else:
+                reports = self.build_reports()
+                for report_name, report_text in reports.items():
+                    (reports_root / report_name).write_text(report_text, encoding="utf-8")
+
+        duplicate_summary = {}
+        if detect_near_duplicates or collapse_duplicates:
+            with self.timer.stage("near_duplicates"):
+                dest_rels = [
+                    dest_rel for dest_rel, _files in group_items if (dst / dest_rel).is_file()
+                ]
+                clusters = find_near_duplicates(dst, dest_rels)
+                if collapse_duplicates:
+                    collapse_near_duplicates(dst, dest_rels, clusters, self.serialize)
+            duplicate_summary = {
+                "near_duplicate_clusters": len(clusters),
+                "near_duplicate_questions": sum(len(cluster["members"]) for cluster in clusters),
+            }
+            if report_writer is not None:
+                report_path = reports_root / "near_duplicates.jsonl"
+                with report_path.open("w", encoding="utf-8") as report_file:
+                    for cluster in clusters:
+                        report_file.write(json.dumps(cluster, ensure_ascii=False) + "\n")
+                reports[report_path.name] = str(report_path)
+            else:
+                report_text = format_clusters(clusters)
+                (reports_root / "near_duplicates.txt").write_text(report_text, encoding="utf-8")
+                reports["near_duplicates.txt"] = report_text
+                duplicate_summary["near_duplicates"] = clusters
+
+        timings = self._finish_timings(run_start, cpu_start)
+        timings_path = self.timer.write(reports_root / TIMINGS_NAME)
+        if report_writer is not None:
+            reports[TIMINGS_NAME] = str(timings_path)
+        else:
+            reports[TIMINGS_NAME] = timings_path.read_text(encoding="utf-8")
+
+        return {
+            "source_dir": str(src),
+            "output_dir": str(dst),
+            "reports_dir": str(reports_root),
+            "input_json_files": sum(len(files) for files in groups.values()),
+            "cleaned_json_files": cleaned_file_count,
+            "cleaned_questions": cleaned_question_count,
+            "reused_json_files": len(group_items) - len(pending),
+            "removed_outputs": removed_outputs,
+            **self._log_summary(report_writer),
+            **duplicate_summary,
+            "timings": timings,
+            "reports": reports,
+        }
+
+    def _finish_timings(self, run_start: float, cpu_start: float) -> dict:
+        self.timer.add(
+            "total", time.perf_counter() - run_start, time.process_time() - cpu_start
+        )
+        return self.timer.to_dict()
+
+    def process_zip(
+        self,
+        src_zip,
+        dst_zip,
+        cleaned_prefix: str = "cleaned",
+        reports_prefix: str = "reports",
+        stream_reports: bool = False,
+        progress=None,
+    ):
+        """
+        Cleans the JSON members of a ZIP archive straight into another ZIP archive.
+        Both arguments may be paths or binary file objects. Groups are read, cleaned and
+        written one at a time, so nothing is extracted to disk. With stream_reports=True
+        the JSONL reports are spooled to temporary files and "reports" maps each report
+        to its member name in the output archive.
+        Stage timings are returned under "timings" and packed as timings.json with the reports.
+        progress(stage, files done, total files) works as in process_directory.
+        """
+        self.reset_logs()
+        self.timer = PipelineTimer(self.slowest_files, self.stage_hook)
+        run_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        with zipfile.ZipFile(src_zip) as source_archive:
+            groups = defaultdict(list)
+            if progress is not None:
+                progress("discover", 0, 0)
+            with self.timer.stage("discover"):
+                for member in source_archive.infolist():
+                    if member.is_dir():
+                        continue
+                    rel = PurePosixPath(member.filename)
+                    if rel.is_absolute() or ".." in rel.parts:
+                        raise ValueError(f"Archive member has an unsafe path: {member.filename}")
+                    if rel.suffix != ".json" or self.should_ignore_json_file(rel):
+                        continue
+                    match = self.p["split_file"].match(rel.name)
+                    base = (match.group(1) if match else rel.stem) + ".json"
+                    groups[rel.parent / base].append(rel)
+
+            if not groups:
+                raise ValueError("The archive does not contain any JSON files.")
+
+            with zipfile.ZipFile(dst_zip, "w", zipfile.ZIP_DEFLATED) as output_archive, \
+                    tempfile.TemporaryDirectory() as spool_dir:
+
+                def clean_members():
+                    for dest_rel, members in groups.items():
+                        timer = self._group_timer()
+                        group_start = time.perf_counter()
+                        members = self._sort_group(dest_rel, members)
+                        with timer.stage("read"):
+                            raw_sources = [
+                                (rel, source_archive.read(rel.as_posix())) for rel in members
+                            ]
+                        output_text, group_result = self._clean_group_sources(
+                            dest_rel, raw_sources, timer
+                        )
+                        if output_text is None:
+                            yield None
+                            continue
+                        with timer.stage("write"):
+                            output_archive.writestr(
+                                (PurePosixPath(cleaned_prefix) / dest_rel).as_posix(),
+                                output_text,
+                            )
+                        timer.record_file(str(dest_rel), time.perf_counter() - group_start)
+                        group_result["timings"] = timer.to_dict()
+                        yield group_result
+
+                group_results = clean_members()
+                if progress is not None:
+                    group_results = self._track_progress(
+                        group_results, [len(members) for members in groups.values()], progress
+                    )
+                report_writer = StreamingReportWriter(Path(spool_dir)) if stream_reports else None
+                cleaned_file_count, cleaned_question_count = self._collect_group_results(
+                    group_results, report_writer
+                )
+                if progress is not None:
+                    total_files = sum(len(members) for members in groups.values())
+                    progress("reports", total_files, total_files)
+
+                reports = {}
+                with self.timer.stage("reports"):
+                    if report_writer is not None:
+                        for report_name, report_path in report_writer.close().items():
+                            arcname = (PurePosixPath(reports_prefix) / report_name).as_posix()
+                            output_archive.write(report_path, arcname=arcname)
+                            reports[report_name] = arcname
+                    else:
+                        reports = self.build_reports()
+                        for report_name, report_text in reports.items():
+                            output_archive.writestr(
+                                (PurePosixPath(reports_prefix) / report_name).as_posix(),
+                                report_text,
+                            )
+
+                timings = self._finish_timings(run_start, cpu_start)
+                timings_text = json.dumps(timings, indent=2)
+                timings_arcname = (PurePosixPath(reports_prefix) / TIMINGS_NAME).as_posix()
+                output_archive.writestr(timings_arcname, timings_text)
+                reports[TIMINGS_NAME] = timings_arcname if report_writer is not None else timings_text
+
+        return {
+            "input_json_files": sum(len(members) for members in groups.values()),
+            "cleaned_json_files": cleaned_file_count,
+            "cleaned_questions": cleaned_question_count,
+            **self._log_summary(report_writer),
+            "timings": timings,
+            "reports": reports,
+        }
+
+    def _track_progress(self, group_results, group_sizes, progress):
+        """Passes group_results through, reporting the files done after each group."""
+        total = sum(group_sizes)
+        done = 0
+        progress("clean", done, total)
+        for group_result, size in zip(group_results, group_sizes):
+            done += size
+            progress("clean", done, total)
+            yield group_result
+
+    def _collect_group_results(self, group_results, report_writer=None):
+        """
+        Merges per-group log entries, in group order, into this cleaner's logs, or hands
+        them to report_writer when reports are streamed.
+        """
+        invalid_years = []
+        duplicate_answers = []
+        repaired_questions = []
+        merged_counts = {}
+        stripped_chars = defaultdict(int)
+        encodings = {}
+        cleaned_file_count = 0
+        cleaned_question_count = 0
+
+        # Groups cleaned in this process reset self's logs, so accumulate locally.
+        for group_result in group_results:
+            if group_result is None:
+                continue
             cleaned_file_count += 1
-            cleaned_question_count += len(merged["content"]["questions"])
+            cleaned_question_count += group_result["questions"]
+            if "timings" in group_result:
+                self.timer.merge(group_result["timings"])
+            if report_writer is not None:
+                report_writer.add(group_result)
+                continue
+            invalid_years.extend(group_result["invalid_years"])
+            duplicate_answers.extend(group_result["duplicate_answers"])
+            repaired_questions.extend(group_result["repaired_questions"])
+            merged_counts.update(group_result["merged_counts"])
+            for char, count in group_result["stripped_chars"].items():
+                stripped_chars[char] += count
+            encodings.update(group_result["encodings"])
 
+        self.invalid_years = invalid_years
+        self.duplicate_answers = duplicate_answers
+        self.repaired_questions = repaired_questions
+        self.merged_counts = merged_counts
+        self.stripped_chars = stripped_chars
+        self.encodings = encodings
+        return cleaned_file_count, cleaned_question_count
+
+    def _log_summary(self, report_writer=None) -> dict:
+        if report_writer is not None:
+            return {
+                "merged_output_count": report_writer.counts["merged_counts"],
+                "invalid_year_count": report_writer.counts["invalid_years"],
+                "duplicate_answer_count": report_writer.counts["duplicate_answers"],
+                "repaired_question_count": report_writer.repaired_question_count,
+                "stripped_char_count": len(report_writer.stripped_chars),
+                "encoding_counts": dict(report_writer.encoding_counts),
+            }
+
+        encoding_counts = defaultdict(int)
+        for encoding in self.encodings.values():
+            encoding_counts[encoding] += 1
+        return {
+            "merged_output_count": len(self.merged_counts),
+            "invalid_year_count": len(self.invalid_years),
+            "duplicate_answer_count": len(self.duplicate_answers),
+            "repaired_question_count": sum(entry["repaired"] for entry in self.repaired_questions),
+            "stripped_char_count": len(self.stripped_chars),
+            "encoding_counts": dict(encoding_counts),
+            "merged_counts": dict(self.merged_counts),
+            "invalid_years": list(self.invalid_years),
+            "duplicate_answers": list(self.duplicate_answers),
+            "repaired_questions": list(self.repaired_questions),
+            "stripped_chars": dict(self.stripped_chars),
+            "encodings": dict(self.encodings),
+        }
+
+    def build_reports(self) -> dict:
         invalid_years_text = "\n".join(
             f"{entry['file']} | year: {entry['year']}" for entry in self.invalid_years
         )
@@ -189,50 +925,130 @@ class MedicalDataCleaner:
             f"final={entry['final']}"
             for entry in self.duplicate_answers
         )
+        repaired_questions_text = "\n".join(
+            f"{entry['file']} → repaired {entry['repaired']} questions: "
+            + "; ".join(
+                f"q#{question['question_index']} " + ", ".join(question["repairs"])
+                + "".join(
+                    f" {key}={question[key]}"
+                    for key in ("filled_options", "option_conflicts", "discarded_answers")
+                    if key in question
+                )
+                for question in entry["questions"]
+            )
+            for entry in self.repaired_questions
+        )
         stripped_chars_text = "\n".join(
             f"{char!r}: {count}"
             for char, count in sorted(self.stripped_chars.items(), key=lambda item: -item[1])
         )
 
-        (reports_root / "invalid_years.txt").write_text(invalid_years_text, encoding="utf-8")
-        (reports_root / "duplicate_answers.txt").write_text(
-            duplicate_answers_text, encoding="utf-8"
-        )
-        (reports_root / "stripped_chars.txt").write_text(
-            stripped_chars_text, encoding="utf-8"
-        )
-
         report_lines = ["Merge/Clean Summary", "=" * 30]
         for filename, count in self.merged_counts.items():
             report_lines.append(f"{filename} → merged {count} files")
+        encoding_counts = defaultdict(int)
+        for filename, encoding in self.encodings.items():
+            encoding_counts[encoding] += 1
+            if encoding != "utf-8":
+                report_lines.append(f"{filename} → encoding {encoding}")
         report_lines.extend(
             [
+                "Source encodings: "
+                + ", ".join(f"{encoding}={count}" for encoding, count in sorted(encoding_counts.items())),
                 f"Invalid years: {len(self.invalid_years)}",
                 f"Duplicate-answer fixes: {len(self.duplicate_answers)}",
+                "Repaired questions: "
+                f"{sum(entry['repaired'] for entry in self.repaired_questions)} "
+                f"in {len(self.repaired_questions)} files",
                 f"Stripped weird chars: {len(self.stripped_chars)}",
             ]
         )
         processing_report_text = "\n".join(report_lines)
-        (reports_root / "processing_report.txt").write_text(
-            processing_report_text,
-            encoding="utf-8",
-        )
 
         return {
-            "source_dir": str(src),
-            "output_dir": str(dst),
-            "reports_dir": str(reports_root),
-            "input_json_files": sum(len(files) for files in groups.values()),
-            "cleaned_json_files": cleaned_file_count,
-            "cleaned_questions": cleaned_question_count,
-            "merged_counts": dict(self.merged_counts),
-            "invalid_years": list(self.invalid_years),
-            "duplicate_answers": list(self.duplicate_answers),
-            "stripped_chars": dict(self.stripped_chars),
-            "reports": {
-                "processing_report.txt": processing_report_text,
-                "invalid_years.txt": invalid_years_text,
-                "duplicate_answers.txt": duplicate_answers_text,
-                "stripped_chars.txt": stripped_chars_text,
-            },
+            "processing_report.txt": processing_report_text,
+            "invalid_years.txt": invalid_years_text,
+            "duplicate_answers.txt": duplicate_answers_text,
+            "repaired_questions.txt": repaired_questions_text,
+            "stripped_chars.txt": stripped_chars_text,
+        }
+
+
+class StreamingReportWriter:
+    """
+    Writes cleaning reports as JSONL, one line per entry, while groups are processed.
+    Only counts are kept in memory; stripped characters are tallied per character.
+    """
+
+    STREAMED_REPORTS = (
+        "merged_counts",
+        "encodings",
+        "invalid_years",
+        "duplicate_answers",
+        "repaired_questions",
+    )
+
+    def __init__(self, reports_root: Path):
+        self.reports_root = Path(reports_root)
+        self.reports_root.mkdir(parents=True, exist_ok=True)
+        self.paths = {
+            name: self.reports_root / f"{name}.jsonl" for name in self.STREAMED_REPORTS
+        }
+        self.files = {
+            name: path.open("w", encoding="utf-8") for name, path in self.paths.items()
+        }
+        self.counts = defaultdict(int)
+        self.stripped_chars = defaultdict(int)
+        self.encoding_counts = defaultdict(int)
+        self.repaired_question_count = 0
+
+    def write(self, name: str, entry: dict):
+        self.files[name].write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.counts[name] += 1
+
+    def add(self, group_result: dict):
+        for filename, count in group_result["merged_counts"].items():
+            self.write("merged_counts", {"file": filename, "merged": count})
+        for filename, encoding in group_result["encodings"].items():
+            self.write("encodings", {"file": filename, "encoding": encoding})
+            self.encoding_counts[encoding] += 1
+        for entry in group_result["invalid_years"]:
+            self.write("invalid_years", entry)
+        for entry in group_result["duplicate_answers"]:
+            self.write("duplicate_answers", entry)
+        for entry in group_result["repaired_questions"]:
+            self.write("repaired_questions", entry)
+            self.repaired_question_count += entry["repaired"]
+        for char, count in group_result["stripped_chars"].items():
+            self.stripped_chars[char] += count
+
+    def close(self) -> dict:
+        """Writes the stripped-character tally and the summary; returns every report path."""
+        for report_file in self.files.values():
+            report_file.close()
+
+        stripped_path = self.reports_root / "stripped_chars.jsonl"
+        with stripped_path.open("w", encoding="utf-8") as report_file:
+            for char, count in sorted(self.stripped_chars.items(), key=lambda item: -item[1]):
+                report_file.write(json.dumps({"char": char, "count": count}, ensure_ascii=False) + "\n")
+
+        summary_lines = [
+            "Merge/Clean Summary",
+            "=" * 30,
+            f"Merged outputs: {self.counts['merged_counts']}",
+            "Source encodings: "
+            + ", ".join(f"{encoding}={count}" for encoding, count in sorted(self.encoding_counts.items())),
+            f"Invalid years: {self.counts['invalid_years']}",
+            f"Duplicate-answer fixes: {self.counts['duplicate_answers']}",
+            f"Repaired questions: {self.repaired_question_count} in {self.counts['repaired_questions']} files",
+            f"Stripped weird chars: {len(self.stripped_chars)}",
+            "Details: " + ", ".join(path.name for path in self.paths.values()) + ", stripped_chars.jsonl",
+        ]
+        summary_path = self.reports_root / "processing_report.txt"
+        summary_path.write_text("\n".join(summary_lines), encoding="utf-8")
+
+        return {
+            summary_path.name: summary_path,
+            **{path.name: path for path in self.paths.values()},
+            stripped_path.name: stripped_path,
         }
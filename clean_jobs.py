@@ -0,0 +1,194 @@
+"""
+Background cleaning jobs.
+
+Jobs run on a bounded thread pool, so however many sessions start a cleaning run only
+max_workers of them clean at once and at most max_queued wait. Each job lives in its own
+directory under jobs_dir: the uploaded archive, status.json (state, stage and files done out
+of total, refreshed while the job runs), the cleaned archive and result.json. Job
+directories are deleted ttl_seconds after they finish, so a page can find its job again
+after a browser refresh without holding the archive in session state.
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 8
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+STATUS_INTERVAL_SECONDS = 0.5
+SOURCE_NAME = "source.zip"
+ARCHIVE_NAME = "cleaned.zip"
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobManager:
+    """
+    runner(source_path, archive_path, progress, source_filename, **options) does the work and returns a
+    JSON-serializable result; progress(stage, done, total) may be called from it at any rate.
+    """
+
+    def __init__(
+        self,
+        jobs_dir,
+        runner,
+        max_workers: int = DEFAULT_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.runner = runner
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clean-job")
+        self._lock = threading.Lock()
+        self._statuses = {}
+        self.cleanup()
+
+    def _job_dir(self, job_id: str) -> Path:
+        if not _JOB_ID.match(job_id or ""):
+            raise KeyError(f"Unknown job: {job_id}")
+        return self.jobs_dir / job_id
+
+    def _write_status(self, job_id: str, status: dict):
+        status_path = self._job_dir(job_id) / "status.json"
+        temp_path = status_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(status), encoding="utf-8")
+        os.replace(temp_path, status_path)
+
+    def _update(self, job_id: str, persist: bool = True, **changes) -> dict:
+        with self._lock:
+            status = self._statuses[job_id]
+            status.update(changes)
+            snapshot = dict(status)
+        if persist:
+            self._write_status(job_id, snapshot)
+        return snapshot
+
+    def submit(self, source, source_filename: str, **options) -> str:
+        """
+        Queues a cleaning job for source (bytes or a binary file object) and returns its ID.
+        Raises RuntimeError when max_queued jobs are already waiting.
+        """
+        self.cleanup()
+        with self._lock:
+            queued = sum(status["state"] == "queued" for status in self._statuses.values())
+        if queued >= self.max_queued:
+            raise RuntimeError("Too many cleaning jobs are waiting. Please try again shortly.")
+
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        job_dir.mkdir()
+        source_path = job_dir / SOURCE_NAME
+        if isinstance(source, bytes):
+            source_path.write_bytes(source)
+        else:
+            with source_path.open("wb") as source_file:
+                shutil.copyfileobj(source, source_file)
+
+        status = {
+            "id": job_id,
+            "state": "queued",
+            "stage": "queued",
+            "done": 0,
+            "total": 0,
+            "error": None,
+            "error_type": None,
+            "source_filename": source_filename,
+            "created": time.time(),
+            "finished": None,
+        }
+        with self._lock:
+            self._statuses[job_id] = status
+        self._write_status(job_id, status)
+        self._executor.submit(self._run, job_id, source_filename, options)
+        return job_id
+
+    def _run(self, job_id: str, source_filename: str, options: dict):
+        job_dir = self._job_dir(job_id)
+        self._update(job_id, state="running", stage="starting")
+        last_write = [0.0]
+
+        def progress(stage, done, total):
+            now = time.monotonic()
+            persist = now - last_write[0] >= STATUS_INTERVAL_SECONDS
+            if persist:
+                last_write[0] = now
+            self._update(job_id, persist=persist, stage=stage, done=done, total=total)
+
+        try:
+            result = self.runner(
+                job_dir / SOURCE_NAME, job_dir / ARCHIVE_NAME, progress, source_filename, **options
+            )
+            (job_dir / "result.json").write_text(json.dumps(result), encoding="utf-8")
+        except Exception as exc:
+            self._update(
+                job_id,
+                state="failed",
+                stage="failed",
+                error=str(exc),
+                error_type=type(exc).__name__,
+                finished=time.time(),
+            )
+        else:
+            self._update(job_id, state="done", stage="done", finished=time.time())
+        finally:
+            (job_dir / SOURCE_NAME).unlink(missing_ok=True)
+
+    def status(self, job_id: str) -> dict | None:
+        """Current status of a job, or None once it has expired or if it never existed."""
+        try:
+            job_dir = self._job_dir(job_id)
+        except KeyError:
+            return None
+        with self._lock:
+            if job_id in self._statuses:
+                return dict(self._statuses[job_id])
+        status_path = job_dir / "status.json"
+        if not status_path.is_file():
+            return None
+        status = json.loads(status_path.read_text(encoding="utf-8"))
+        if status["state"] in ("queued", "running"):
+            # Written by a process that is gone.
+            status.update(state="failed", stage="failed", error="The job was interrupted.")
+        return status
+
+    def result(self, job_id: str) -> dict | None:
+        """The runner's result plus archive_path, once the job is done."""
+        status = self.status(job_id)
+        if status is None or status["state"] != "done":
+            return None
+        job_dir = self._job_dir(job_id)
+        result = json.loads((job_dir / "result.json").read_text(encoding="utf-8"))
+        return {**result, "archive_path": str(job_dir / ARCHIVE_NAME)}
+
+    def cleanup(self) -> int:
+        """Deletes jobs that finished more than ttl_seconds ago; returns how many."""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for job_dir in self.jobs_dir.iterdir():
+            if not job_dir.is_dir() or not _JOB_ID.match(job_dir.name):
+                continue
+            with self._lock:
+                status = self._statuses.get(job_dir.name)
+                if status is not None and status["finished"] is None:
+                    continue
+                finished = status["finished"] if status is not None else None
+            if finished is None:
+                # Not tracked by this process: judge by the directory's age.
+                status_path = job_dir / "status.json"
+                finished = (status_path if status_path.exists() else job_dir).stat().st_mtime
+            if finished < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                with self._lock:
+                    self._statuses.pop(job_dir.name, None)
+                removed += 1
+        return removed
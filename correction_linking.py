@@ -1,5 +1,275 @@
+"""
+Links correction and explanation paragraphs to the questions they belong to.
+
+Cleaned question texts (stem plus options) go into a TF-IDF inverted index: each term
+keeps a posting list of (question, weight) pairs with weights already L2-normalised per
+question. A correction paragraph is scored only against the questions that share one of
+its terms, so retrieval cost follows the posting lists it touches rather than the corpus
+size. Terms found in more than max_df of all questions (articles, "la", "les") are left
+out of the index, and only a query's max_query_terms highest-weighted terms are looked up,
+which keeps long paragraphs fast.
+"""
+
+import hashlib
+import heapq
+import io
+import json
+import math
+import re
+import unicodedata
+import zipfile
+from array import array
+from collections import Counter, defaultdict
+from operator import itemgetter
+from pathlib import Path
+
 import streamlit as st
 
+from clean_directory import archive_prefix, default_json_loads, iter_archive_exams
+from near_duplicates import question_id, question_text
+
+DEFAULT_TOP_K = 3
+DEFAULT_MAX_DF = 0.05
+DEFAULT_MAX_QUERY_TERMS = 32
+# Terms are only dropped as too common once they appear in more questions than this.
+MIN_STOP_TERM_DOCUMENTS = 100
+# (label, minimum score, minimum margin over the runner-up)
+CONFIDENCE_LEVELS = (("high", 0.5, 0.1), ("medium", 0.3, 0.0))
+MIN_PARAGRAPH_CHARS = 40
+PREVIEW_CHARS = 120
+
+_WORD = re.compile(r"[^\W\d_]{2,}")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased, accent-folded words of two letters or more; digits are dropped."""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return _WORD.findall("".join(ch for ch in folded if not unicodedata.combining(ch)))
+
+
+def confidence_label(score: float, margin: float) -> str:
+    for label, min_score, min_margin in CONFIDENCE_LEVELS:
+        if score >= min_score and margin >= min_margin:
+            return label
+    return "low"
+
+
+class TfidfIndex:
+    """
+    Cosine-similarity search over question texts.
+    build() takes (question id, text, preview) triples; search() and search_batch() return
+    (question id, score) pairs, best first.
+    """
+
+    def __init__(self, max_df: float = DEFAULT_MAX_DF, max_query_terms: int = DEFAULT_MAX_QUERY_TERMS):
+        self.max_df = max_df
+        self.max_query_terms = max_query_terms
+        self.ids = []
+        self.positions = {}
+        self.previews = []
+        self.idf = {}
+        self.postings = {}
+
+    @classmethod
+    def from_exams(cls, exams, json_loads=None, **options) -> "TfidfIndex":
+        """Indexes every question of exams, given as (relative path, load) pairs."""
+        loads = json_loads or default_json_loads()
+
+        def documents():
+            for rel_path, load in exams:
+                data = loads(load())
+                for index, question in enumerate(data.get("content", {}).get("questions", [])):
+                    yield question_id(rel_path, index), question_text(question), question.get("question", "")
+
+        return cls(**options).build(documents())
+
+    def build(self, documents) -> "TfidfIndex":
+        term_counts = []
+        document_frequency = Counter()
+        for doc_id, text, preview in documents:
+            counts = Counter(tokenize(text))
+            self.positions[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.previews.append(preview[:PREVIEW_CHARS])
+            term_counts.append(counts)
+            document_frequency.update(counts.keys())
+
+        total = len(self.ids)
+        max_documents = max(MIN_STOP_TERM_DOCUMENTS, self.max_df * total)
+        self.idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+            if frequency <= max_documents
+        }
+
+        postings = defaultdict(lambda: (array("I"), array("f")))
+        idf = self.idf
+        for doc, counts in enumerate(term_counts):
+            weights = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items() if term in idf}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for term, weight in weights.items():
+                docs, values = postings[term]
+                docs.append(doc)
+                values.append(weight / norm)
+        self.postings = dict(postings)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query_vector(self, text: str) -> list[tuple[str, float]]:
+        """The query's max_query_terms highest-weighted indexed terms, normalised."""
+        counts = Counter(term for term in tokenize(text) if term in self.idf)
+        weights = [(term, (1 + math.log(count)) * self.idf[term]) for term, count in counts.items()]
+        weights = heapq.nlargest(self.max_query_terms, weights, key=itemgetter(1))
+        norm = math.sqrt(sum(weight * weight for _term, weight in weights)) or 1.0
+        return [(term, weight / norm) for term, weight in weights]
+
+    def search(self, text: str, k: int = DEFAULT_TOP_K) -> list[tuple[str, float]]:
+        scores = {}
+        get = scores.get
+        for term, query_weight in self.query_vector(text):
+            docs, values = self.postings[term]
+            for doc, value in zip(docs, values):
+                scores[doc] = get(doc, 0.0) + query_weight * value
+        top = heapq.nlargest(k, scores.items(), key=itemgetter(1))
+        return [(self.ids[doc], score) for doc, score in top]
+
+    def search_batch(self, texts, k: int = DEFAULT_TOP_K) -> list[list[tuple[str, float]]]:
+        """Top k matches for each text; repeated texts are searched once."""
+        results = {}
+        return [results[text] if text in results else results.setdefault(text, self.search(text, k)) for text in texts]
+
+    def preview(self, doc_id: str) -> str:
+        return self.previews[self.positions[doc_id]]
+
+
+def correction_paragraphs(text: str, min_chars: int = MIN_PARAGRAPH_CHARS) -> list[str]:
+    """Blank-line separated paragraphs of a correction document, without the very short ones."""
+    paragraphs = (" ".join(block.split()) for block in re.split(r"\n\s*\n", text))
+    return [paragraph for paragraph in paragraphs if len(paragraph) >= min_chars]
+
+
+def pdf_text(pdf_bytes: bytes) -> str:
+    """PDF text with a blank line wherever the vertical gap between lines suggests a new paragraph."""
+    from digitalization import PdfExamExtractor
+
+    _digest, pages = PdfExamExtractor(workers=1).extract_pages(pdf_bytes)
+    blocks = []
+    for page in pages:
+        previous = None
+        for line in page["lines"]:
+            if previous is not None and line["y0"] - previous["y1"] > (previous["y1"] - previous["y0"]):
+                blocks.append("")
+            blocks.append(line["text"])
+            previous = line
+        blocks.append("")
+    return "\n".join(blocks)
+
+
+def link_corrections(index: TfidfIndex, paragraphs: list[str], k: int = DEFAULT_TOP_K) -> list[dict]:
+    """
+    Best matches for each paragraph with a confidence label from the top score and its
+    margin over the runner-up.
+    """
+    links = []
+    for paragraph, matches in zip(paragraphs, index.search_batch(paragraphs, k)):
+        score = matches[0][1] if matches else 0.0
+        margin = score - (matches[1][1] if len(matches) > 1 else 0.0)
+        links.append(
+            {
+                "paragraph": paragraph,
+                "question_id": matches[0][0] if matches else None,
+                "score": round(score, 4),
+                "margin": round(margin, 4),
+                "confidence": confidence_label(score, margin) if matches else "none",
+                "matches": [{"question_id": doc_id, "score": round(value, 4)} for doc_id, value in matches],
+            }
+        )
+    return links
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def build_archive_index(archive_bytes: bytes) -> TfidfIndex:
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        return TfidfIndex.from_exams(iter_archive_exams(archive, archive_prefix(archive)))
+
+
 def show_correction_linking_page():
     st.title("Correction Linking")
-    st.write("This page is under construction.")
\ No newline at end of file
+    st.write(
+        "Upload a cleaned ZIP (from Clean Folder) and correction documents. Every paragraph is "
+        "matched against all questions; review the low-confidence links before using them."
+    )
+
+    uploaded_zip = st.file_uploader("Cleaned exams ZIP", type="zip", key="correction_linking_zip")
+    if uploaded_zip is None:
+        return
+    archive_bytes = uploaded_zip.getvalue()
+    # Links are kept per archive; question IDs from another archive are not in this index.
+    archive_hash = hashlib.sha256(archive_bytes).hexdigest()[:16]
+    try:
+        with st.spinner("Indexing questions..."):
+            index = build_archive_index(archive_bytes)
+    except (zipfile.BadZipFile, ValueError) as exc:
+        st.error(f"Could not read the archive: {exc}")
+        return
+    st.caption(f"{len(index)} questions indexed, {len(index.postings)} distinct terms.")
+
+    correction_files = st.file_uploader(
+        "Correction documents", type=["txt", "pdf"], accept_multiple_files=True, key="correction_linking_docs"
+    )
+    pasted = st.text_area("Or paste corrections (one paragraph per correction, separated by blank lines)", height=200)
+    top_k = st.slider("Matches per correction", min_value=1, max_value=10, value=DEFAULT_TOP_K)
+
+    if st.button("Link Corrections", type="primary"):
+        paragraphs = correction_paragraphs(pasted)
+        for correction_file in correction_files or []:
+            if Path(correction_file.name).suffix.lower() == ".pdf":
+                paragraphs.extend(correction_paragraphs(pdf_text(correction_file.getvalue())))
+            else:
+                paragraphs.extend(correction_paragraphs(correction_file.getvalue().decode("utf-8", errors="replace")))
+        if not paragraphs:
+            st.error("No correction paragraphs were found.")
+            return
+        with st.spinner(f"Matching {len(paragraphs)} paragraphs..."):
+            st.session_state.correction_links = {
+                "archive_hash": archive_hash,
+                "links": link_corrections(index, paragraphs, top_k),
+            }
+
+    stored = st.session_state.get("correction_links")
+    if not stored or stored["archive_hash"] != archive_hash:
+        return
+    links = stored["links"]
+
+    counts = Counter(link["confidence"] for link in links)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Paragraphs", len(links))
+    col2.metric("High Confidence", counts["high"])
+    col3.metric("Medium Confidence", counts["medium"])
+    col4.metric("Low Confidence", counts["low"] + counts["none"])
+
+    shown = st.multiselect("Show confidence", ["high", "medium", "low", "none"], default=["medium", "low", "none"])
+    st.dataframe(
+        [
+            {
+                "Confidence": link["confidence"],
+                "Score": link["score"],
+                "Margin": link["margin"],
+                "Correction": link["paragraph"][:PREVIEW_CHARS],
+                "Question": link["question_id"],
+                "Question Text": index.preview(link["question_id"]) if link["question_id"] else "",
+            }
+            for link in links
+            if link["confidence"] in shown
+        ],
+        width="stretch",
+    )
+    st.download_button(
+        "Download Links (JSON)",
+        data=lambda: json.dumps(links, ensure_ascii=False, indent=2).encode("utf-8"),
+        file_name="correction_links.json",
+        mime="application/json",
+        on_click="ignore",
+    )
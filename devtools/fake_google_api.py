@@ -0,0 +1,148 @@
+"""
+Local stand-in for the Drive and Sheets endpoints the app calls.
+
+Usage:
+    python devtools/fake_google_api.py [--port 8765] [--fail-every N] [--fail-status 503]
+    GOOGLE_API_ENDPOINT=http://127.0.0.1:8765 streamlit run streamlit_app.py
+
+Implements multipart Drive file creation and Sheets values.append, keeps everything in
+memory and exposes it as JSON under /_fake/files and /_fake/sheets. With --fail-every N
+every Nth request is answered with --fail-status first, to exercise the client retries.
+"""
+
+import argparse
+import itertools
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+
+class FakeGoogleState:
+    def __init__(self, fail_every: int = 0, fail_status: int = 503):
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.files = []
+        self.sheets = {}
+        self.requests = 0
+        self.failures = 0
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            if self.fail_every and self.requests % self.fail_every == 0:
+                self.failures += 1
+                return True
+            return False
+
+    def create_file(self, metadata: dict, content: bytes) -> dict:
+        with self.lock:
+            file_id = f"fake-{next(self._ids)}"
+            self.files.append({"id": file_id, "metadata": metadata, "size": len(content)})
+        return {"id": file_id, "webViewLink": f"https://drive.example/{file_id}"}
+
+    def append_rows(self, spreadsheet_id: str, cell_range: str, rows: list) -> dict:
+        with self.lock:
+            sheet = self.sheets.setdefault(spreadsheet_id, [])
+            start = len(sheet) + 1
+            sheet.extend(rows)
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "tableRange": cell_range,
+            "updates": {
+                "spreadsheetId": spreadsheet_id,
+                "updatedRange": f"{cell_range.split('!')[0]}!A{start}:K{start + len(rows) - 1}",
+                "updatedRows": len(rows),
+            },
+        }
+
+
+def parse_multipart(content_type: str, body: bytes) -> tuple[dict, bytes]:
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    parts = list(message.iter_parts())
+    metadata = json.loads(parts[0].get_content()) if parts else {}
+    content = parts[1].get_payload(decode=True) if len(parts) > 1 else b""
+    return metadata, content
+
+
+def make_handler(state: FakeGoogleState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/_fake/files":
+                self.send_json(200, state.files)
+            elif path == "/_fake/sheets":
+                self.send_json(200, state.sheets)
+            elif path == "/_fake/stats":
+                self.send_json(200, {"requests": state.requests, "failures": state.failures})
+            else:
+                self.send_json(404, {"error": {"code": 404, "message": f"Unknown path {path}"}})
+
+        def do_POST(self):
+            body = self.read_body()
+            if state.should_fail():
+                self.send_json(
+                    state.fail_status,
+                    {"error": {"code": state.fail_status, "message": "Injected failure"}},
+                )
+                return
+
+            path = unquote(urlsplit(self.path).path)
+            if path == "/upload/drive/v3/files":
+                metadata, content = parse_multipart(self.headers["Content-Type"], body)
+                self.send_json(200, state.create_file(metadata, content))
+            elif path.startswith("/v4/spreadsheets/") and path.endswith(":append"):
+                spreadsheet_id, _, cell_range = path[len("/v4/spreadsheets/"):-len(":append")].partition("/values/")
+                rows = json.loads(body or b"{}").get("values", [])
+                self.send_json(200, state.append_rows(spreadsheet_id, cell_range, rows))
+            else:
+                self.send_json(404, {"error": {"code": 404, "message": f"Unknown path {path}"}})
+
+    return Handler
+
+
+def make_server(port: int = 8765, fail_every: int = 0, fail_status: int = 503):
+    """Returns (server, state); call server.serve_forever(), e.g. on a daemon thread in tests."""
+    state = FakeGoogleState(fail_every, fail_status)
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(state)), state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="fail every Nth request")
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server, _state = make_server(args.port, args.fail_every, args.fail_status)
+    print(f"Fake Google APIs listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint used by llm_structuring.py.
+
+Usage:
+    python devtools/llm_stub_server.py [--port 8766] [--latency 0.5] [--fail-every N]
+    OPENAI_BASE_URL=http://127.0.0.1:8766/v1 streamlit run streamlit_app.py
+
+Answers POST /v1/chat/completions by structuring the raw questions in the user message
+with a plain rule-based parser ("A- ..." lines become options, "*" marks a correct one),
+after --latency seconds, so whole pipelines and their throughput can be run offline. With
+--fail-every N every Nth request gets a 429 with Retry-After, to exercise the client
+backoff. Counters are exposed as JSON under /_stub/stats.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+_NUMBER = re.compile(r"^\s*(?:Q(?:uestion)?\s*\.?\s*)?\d{1,4}\s*[°.)-]\s*", re.I)
+_OPTION = re.compile(r"^\s*(\*?)\s*([A-E])\s*[-–).]\s*(.*)$")
+
+
+def structure_text(text: str) -> dict:
+    stem_lines, options, answers = [], {}, []
+    for line in _NUMBER.sub("", text, count=1).splitlines():
+        match = _OPTION.match(line)
+        if match and match.group(2) == "ABCDE"[len(options):len(options) + 1]:
+            options[match.group(2)] = match.group(3).strip()
+            if match.group(1):
+                answers.append(match.group(2))
+        elif options:
+            last = list(options)[-1]
+            options[last] = f"{options[last]} {line.strip()}".strip()
+        else:
+            stem_lines.append(line.strip())
+    return {"question": " ".join(part for part in stem_lines if part), "options": options, "correct_answers": answers}
+
+
+class StubState:
+    def __init__(self, latency: float = 0.0, fail_every: int = 0, retry_after: float = 0.1):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.failures = 0
+        self.questions = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def start(self) -> bool:
+        """Counts a request; returns False when it should be rate limited."""
+        with self.lock:
+            self.requests += 1
+            if self.fail_every and self.requests % self.fail_every == 0:
+                self.failures += 1
+                return False
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return True
+
+    def finish(self, questions: int):
+        with self.lock:
+            self.in_flight -= 1
+            self.questions += questions
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "questions": self.questions,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/_stub/stats":
+                self.send_json(200, state.stats())
+            else:
+                self.send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            path = urlsplit(self.path).path
+            if path != "/v1/chat/completions":
+                self.send_json(404, {"error": {"message": f"Unknown path {path}"}})
+                return
+            if not state.start():
+                self.send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}},
+                    {"Retry-After": str(state.retry_after)},
+                )
+                return
+
+            questions = []
+            try:
+                request = json.loads(body)
+                user_content = next(
+                    message["content"] for message in reversed(request["messages"]) if message["role"] == "user"
+                )
+                texts = json.loads(user_content)["questions"]
+                questions = [structure_text(text) for text in texts]
+                time.sleep(state.latency)
+                content = json.dumps({"questions": questions}, ensure_ascii=False)
+                self.send_json(
+                    200,
+                    {
+                        "id": f"chatcmpl-stub-{state.requests}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": content},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": len(user_content) // 4,
+                            "completion_tokens": len(content) // 4,
+                            "total_tokens": (len(user_content) + len(content)) // 4,
+                        },
+                    },
+                )
+            except (ValueError, KeyError, StopIteration) as exc:
+                self.send_json(400, {"error": {"message": f"Bad request: {exc}", "type": "invalid_request_error"}})
+            finally:
+                state.finish(len(questions))
+
+    return Handler
+
+
+def make_server(port: int = 8766, latency: float = 0.0, fail_every: int = 0):
+    """Returns (server, state); call server.serve_forever(), e.g. on a daemon thread in tests."""
+    state = StubState(latency, fail_every)
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(state)), state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per request")
+    parser.add_argument("--fail-every", type=int, default=0, help="rate limit every Nth request")
+    args = parser.parse_args()
+
+    server, _state = make_server(args.port, args.latency, args.fail_every)
+    print(f"LLM stub listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
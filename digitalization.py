@@ -0,0 +1,447 @@
+"""
+PDF-to-exam extraction.
+
+Each page of an exam PDF is read once: its text lines (with their vertical position) and
+embedded images are extracted, across a process pool for large documents, and cached on
+disk per page. Questions and options are then split out of the lines of all pages in
+reading order. That step is cheap and always re-run, so changing the parser never
+invalidates the page cache.
+
+Embedded images are deduplicated (logos and headers drawn on every page are dropped),
+mapped to the nearest question by their position on the page, and can be uploaded in one
+batch to fill each question's image_url and hasImage.
+
+Scanned PDFs without a text layer yield images but no text; they are not OCRed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pymupdf
+
+from image_pipeline import image_fields, prepare_image
+from pipeline_timing import PipelineTimer
+
+EXTRACTOR_VERSION = "1"
+OPTION_LETTERS = "ABCDE"
+# Pages are extracted in-process below this many pages; a pool costs more than it saves.
+POOL_MIN_PAGES = 8
+# Lines in this top/bottom fraction of a page that recur on several pages are headers/footers.
+MARGIN_FRACTION = 0.07
+# A question number may skip this many numbers (e.g. an unreadable question) and still count.
+MAX_NUMBER_GAP = 5
+# An image drawn on this many pages (or on every page of a shorter PDF) is a logo or header.
+REPEATED_IMAGE_PAGES = 3
+# Images smaller than this on either side are bullets, rules or scanning specks.
+MIN_IMAGE_SIDE = 24
+
+_QUESTION_START = re.compile(
+    r"^\s*(?:(?:Q(?:uestion)?\s*\.?\s*)(?P<q>\d{1,4})\s*[.:)°-]?|(?P<deg>\d{1,4})\s*°|(?P<dot>\d{1,4})\s*(?P<sep>[.)])(?=\s|$))\s*",
+    re.I,
+)
+_OPTION_START = re.compile(r"^\s*(?P<letter>[A-E])\s*[-–)]\s*")
+_PAGE_NUMBER = re.compile(r"^\s*(?:page\s*)?\d+\s*(?:/\s*\d+)?\s*$", re.I)
+_DIGITS = re.compile(r"\d+")
+
+_WORKER_DOCUMENT = None
+_WORKER_IMAGES = None
+
+
+def document_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_key(digest: str, page_number: int) -> str:
+    """Cache key of one page: the document's content hash, the page and the extractor version."""
+    return hashlib.sha256(f"{EXTRACTOR_VERSION}:{digest}:{page_number}".encode("ascii")).hexdigest()
+
+
+def extract_page(document, page_number: int, image_memo: dict | None = None) -> dict:
+    """
+    Text lines (top to bottom, with their y range) and embedded images of one page.
+    Images carry their bytes, xref, bounding box and a SHA-256 of the bytes. image_memo
+    maps xrefs already extracted from this document to their image, so an image drawn on
+    every page is decoded once.
+    """
+    page = document[page_number]
+    lines = []
+    text = page.get_text("dict", flags=pymupdf.TEXTFLAGS_TEXT, sort=True)
+    for block in text["blocks"]:
+        for line in block.get("lines", []):
+            line_text = "".join(span["text"] for span in line["spans"]).strip()
+            if line_text:
+                x0, y0, _x1, y1 = line["bbox"]
+                lines.append({"text": line_text, "x0": round(x0, 1), "y0": round(y0, 1), "y1": round(y1, 1)})
+
+    images = []
+    image_memo = {} if image_memo is None else image_memo
+    for info in page.get_image_info(xrefs=True):
+        xref = info.get("xref", 0)
+        if not xref:
+            continue  # inline images have no xref to extract
+        if xref not in image_memo:
+            image = document.extract_image(xref)
+            image_memo[xref] = (
+                {
+                    "xref": xref,
+                    "width": image["width"],
+                    "height": image["height"],
+                    "ext": image["ext"],
+                    "sha256": hashlib.sha256(image["image"]).hexdigest(),
+                    "data": image["image"],
+                }
+                if image and image.get("image")
+                else None
+            )
+        image = image_memo[xref]
+        if image is not None:
+            images.append({**image, "bbox": [round(value, 1) for value in info["bbox"]]})
+
+    return {
+        "page": page_number,
+        "width": round(page.rect.width, 1),
+        "height": round(page.rect.height, 1),
+        "lines": lines,
+        "images": images,
+    }
+
+
+def _init_page_worker(source):
+    global _WORKER_DOCUMENT, _WORKER_IMAGES
+    _WORKER_DOCUMENT = pymupdf.open(stream=source) if isinstance(source, bytes) else pymupdf.open(source)
+    _WORKER_IMAGES = {}
+
+
+def _extract_page_in_worker(page_number: int) -> dict:
+    return extract_page(_WORKER_DOCUMENT, page_number, _WORKER_IMAGES)
+
+
+class PageCache:
+    """
+    Extracted pages on disk: <key>.json per page, and each image once under images/ named
+    by its SHA-256, so images repeated across pages and documents are stored once.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.images_dir = self.cache_dir / "images"
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+
+    def _write_atomic(self, path: Path, data: bytes):
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as temp_file:
+            temp_file.write(data)
+        os.replace(temp_file.name, path)
+
+    def get(self, key: str) -> dict | None:
+        path = self.cache_dir / f"{key}.json"
+        try:
+            page = json.loads(path.read_text(encoding="utf-8"))
+            for image in page["images"]:
+                image["data"] = (self.images_dir / f"{image['sha256']}.{image['ext']}").read_bytes()
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+        return page
+
+    def put(self, key: str, page: dict):
+        for image in page["images"]:
+            image_path = self.images_dir / f"{image['sha256']}.{image['ext']}"
+            if not image_path.exists():
+                self._write_atomic(image_path, image["data"])
+        stored = {**page, "images": [{k: v for k, v in image.items() if k != "data"} for image in page["images"]]}
+        self._write_atomic(self.cache_dir / f"{key}.json", json.dumps(stored).encode("utf-8"))
+
+
+def strip_page_furniture(pages: list[dict]) -> list[dict]:
+    """
+    Drops page numbers and the header/footer lines that recur in the page margins, so they
+    do not end up inside question text.
+    """
+    def margin_key(page, line):
+        margin = page["height"] * MARGIN_FRACTION
+        if line["y1"] <= margin or line["y0"] >= page["height"] - margin:
+            return _DIGITS.sub("#", line["text"]).casefold()
+        return None
+
+    counts = Counter()
+    for page in pages:
+        counts.update({key for line in page["lines"] if (key := margin_key(page, line)) is not None})
+    repeat_threshold = max(2, len(pages) // 2)
+
+    stripped = []
+    for page in pages:
+        lines = []
+        for line in page["lines"]:
+            key = margin_key(page, line)
+            if key is not None and (counts[key] >= repeat_threshold or _PAGE_NUMBER.match(line["text"])):
+                continue
+            lines.append(line)
+        stripped.append({**page, "lines": lines})
+    return stripped
+
+
+def numbering_style(match) -> str:
+    """"q" for "Qn", "deg" for "n°", "dot." or "dot)" for "n." / "n)"."""
+    if match.group("q"):
+        return "q"
+    if match.group("deg"):
+        return "deg"
+    return "dot" + match.group("sep")
+
+
+def parse_questions(pages: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    Splits the lines of all pages into questions in the Create Exam schema.
+
+    A line starts question n when it begins with "n°", "Qn", "n." or "n)" in the same
+    numbering style as the first question, and n follows the previous question number, so
+    numbered statements inside a "1°" question ("1) ...", "2) ...") stay in its text. A
+    line starts an option when it begins with the next letter of A- to E-. Any other line
+    continues the current option or question text.
+    Returns the questions and, for each, its number and where it starts and ends
+    ({"number", "page", "top", "end_page", "bottom"}).
+    """
+    questions = []
+    positions = []
+    current = None
+    last_number = 0
+    numbering = None
+
+    for page in pages:
+        for line in page["lines"]:
+            text = line["text"]
+            match = _QUESTION_START.match(text)
+            if match:
+                number = int(match.group("q") or match.group("deg") or match.group("dot"))
+                style = numbering_style(match)
+                if last_number < number <= last_number + MAX_NUMBER_GAP and numbering in (None, style):
+                    numbering = style
+                    current = {"question": [text[match.end():]], "options": {}, "last_option": None}
+                    questions.append(current)
+                    positions.append(
+                        {
+                            "number": number,
+                            "page": page["page"],
+                            "top": line["y0"],
+                            "end_page": page["page"],
+                            "bottom": line["y1"],
+                        }
+                    )
+                    last_number = number
+                    continue
+            if current is None:
+                continue  # title block before the first question
+
+            positions[-1]["end_page"] = page["page"]
+            positions[-1]["bottom"] = line["y1"]
+            option = _OPTION_START.match(text)
+            expected = OPTION_LETTERS[len(current["options"])] if len(current["options"]) < len(OPTION_LETTERS) else None
+            if option and option.group("letter").upper() == expected:
+                current["options"][expected] = [text[option.end():]]
+                current["last_option"] = expected
+            elif current["last_option"] is not None:
+                current["options"][current["last_option"]].append(text)
+            else:
+                current["question"].append(text)
+
+    parsed = [
+        {
+            "question": " ".join(part for part in current["question"] if part).strip(),
+            "options": {letter: " ".join(parts).strip() for letter, parts in current["options"].items()},
+            "correct_answers": [],
+            "isAnswered": False,
+        }
+        for current in questions
+    ]
+    return parsed, positions
+
+
+def select_question_images(pages: list[dict], positions: list[dict]) -> dict:
+    """
+    Picks the figure of each question from the extracted pages' images.
+
+    Images repeated on REPEATED_IMAGE_PAGES pages (or every page), tiny images and
+    further copies of an image already seen (same content hash, whatever its xref) are
+    dropped. Each remaining image goes to the question whose span on the page contains
+    its centre, else to the nearest question on the same page, else to the question still
+    running from an earlier page. A question with several images keeps the largest.
+    Returns {"images": {question index: image}, "skipped": counts per reason}.
+    """
+    pages_by_hash = defaultdict(set)
+    for page in pages:
+        for image in page["images"]:
+            pages_by_hash[image["sha256"]].add(page["page"])
+    repeat_threshold = max(2, min(REPEATED_IMAGE_PAGES, len(pages)))
+
+    questions_by_page = defaultdict(list)
+    for index, position in enumerate(positions):
+        for page_number in range(position["page"], position["end_page"] + 1):
+            questions_by_page[page_number].append(index)
+
+    def distance(position, page_number, y):
+        start = (position["page"], position["top"])
+        end = (position["end_page"], position["bottom"])
+        if start <= (page_number, y) <= end:
+            return 0.0
+        if position["page"] == page_number and y < position["top"]:
+            return position["top"] - y
+        if position["end_page"] == page_number and y > position["bottom"]:
+            return y - position["bottom"]
+        return float("inf")
+
+    selected = {}
+    skipped = Counter()
+    seen = set()
+    for page in pages:
+        for image in page["images"]:
+            x0, y0, x1, y1 = image["bbox"]
+            if len(pages_by_hash[image["sha256"]]) >= repeat_threshold:
+                skipped["repeated"] += 1
+                continue
+            if min(image["width"], image["height"], x1 - x0, y1 - y0) < MIN_IMAGE_SIDE:
+                skipped["small"] += 1
+                continue
+            if image["sha256"] in seen:
+                skipped["duplicate"] += 1
+                continue
+            seen.add(image["sha256"])
+
+            centre = (y0 + y1) / 2
+            candidates = questions_by_page.get(page["page"], [])
+            if candidates:
+                # min() keeps the earlier question on ties.
+                question_index = min(candidates, key=lambda index: distance(positions[index], page["page"], centre))
+            else:
+                earlier = [index for index, position in enumerate(positions) if position["page"] < page["page"]]
+                if not earlier:
+                    skipped["unassigned"] += 1
+                    continue
+                question_index = earlier[-1]
+
+            area = (x1 - x0) * (y1 - y0)
+            current = selected.get(question_index)
+            if current is not None:
+                skipped["extra"] += 1
+                current_area = (current["bbox"][2] - current["bbox"][0]) * (current["bbox"][3] - current["bbox"][1])
+                if area <= current_area:
+                    continue
+            selected[question_index] = {**image, "page": page["page"]}
+
+    return {"images": selected, "skipped": dict(skipped)}
+
+
+def attach_question_images(questions: list[dict], images: dict, uploads, prepare=prepare_image) -> dict:
+    """
+    Uploads the selected images (question index -> image) through uploads, an
+    ImageUploadCache, and fills image_url, the image fields and hasImage of every question.
+    All uploads are submitted before any is awaited, so they run with the cache's bounded
+    concurrency. Returns the number uploaded and the failures.
+    """
+    submitted = {}
+    for index, image in images.items():
+        prepared = prepare(image["data"])
+        submitted[index] = (uploads.submit(prepared["data"]), prepared)
+
+    failed = []
+    for index, (key, prepared) in submitted.items():
+        try:
+            url = uploads.result(key)
+        except Exception as exc:
+            failed.append({"question_index": index, "error": str(exc)})
+            continue
+        questions[index]["image_url"] = url
+        questions[index].update(image_fields(prepared))
+
+    for question in questions:
+        question["hasImage"] = "image_url" in question
+    return {"uploaded": len(submitted) - len(failed), "failed": failed}
+
+
+class PdfExamExtractor:
+    """
+    Extracts exams from PDFs. cache_dir (optional) keeps extracted pages between runs;
+    workers is the process pool size for documents of POOL_MIN_PAGES pages or more.
+    """
+
+    def __init__(self, cache_dir=None, workers: int | None = None, stage_hook=None):
+        self.cache = PageCache(cache_dir) if cache_dir is not None else None
+        self.workers = workers or os.cpu_count() or 1
+        self.stage_hook = stage_hook
+
+    def _extract_pages(self, source, page_numbers: list[int]) -> list[dict]:
+        if self.workers <= 1 or len(page_numbers) < POOL_MIN_PAGES:
+            document = pymupdf.open(stream=source) if isinstance(source, bytes) else pymupdf.open(source)
+            with document:
+                image_memo = {}
+                return [extract_page(document, number, image_memo) for number in page_numbers]
+
+        workers = min(self.workers, len(page_numbers))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_page_worker,
+            initargs=(source,),
+        ) as executor:
+            return list(
+                executor.map(
+                    _extract_page_in_worker,
+                    page_numbers,
+                    chunksize=max(1, len(page_numbers) // (workers * 4)),
+                )
+            )
+
+    def extract_pages(self, source, timer: PipelineTimer | None = None) -> tuple[str, list[dict]]:
+        """
+        Returns the document's content hash and its extracted pages, reading only the
+        pages that are not cached yet. source is the PDF as bytes or a path.
+        """
+        timer = timer or PipelineTimer()
+        with timer.stage("open"):
+            data = source if isinstance(source, bytes) else Path(source).read_bytes()
+            digest = document_hash(data)
+            with pymupdf.open(stream=data) as document:
+                page_count = document.page_count
+
+        pages = {}
+        with timer.stage("cache_lookup"):
+            if self.cache is not None:
+                for number in range(page_count):
+                    cached = self.cache.get(page_key(digest, number))
+                    if cached is not None:
+                        pages[number] = cached
+        missing = [number for number in range(page_count) if number not in pages]
+
+        if missing:
+            with timer.stage("extract"):
+                extracted = self._extract_pages(data, missing)
+            with timer.stage("cache_store"):
+                for page in extracted:
+                    pages[page["page"]] = page
+                    if self.cache is not None:
+                        self.cache.put(page_key(digest, page["page"]), page)
+
+        return digest, [pages[number] for number in range(page_count)]
+
+    def extract(self, source) -> dict:
+        """
+        Extracts an exam: its questions (Create Exam schema), where each question sits in
+        the PDF, the extracted pages with their images, and stage timings.
+        """
+        timer = PipelineTimer(on_stage=self.stage_hook)
+        with timer.stage("total"):
+            digest, pages = self.extract_pages(source, timer)
+            with timer.stage("parse"):
+                questions, positions = parse_questions(strip_page_furniture(pages))
+
+        return {
+            "document_sha256": digest,
+            "page_count": len(pages),
+            "questions": questions,
+            "positions": positions,
+            "pages": pages,
+            "timings": timer.to_dict(),
+        }
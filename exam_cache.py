@@ -0,0 +1,104 @@
+"""
+Parsed-exam cache for the viewer and editor pages.
+
+An uploaded exam is parsed once per distinct content (SHA-256 of the file) together with
+what the pages need on every rerun: per-question render data and indexes of the questions
+that have an image or are still unanswered.
+"""
+
+import hashlib
+import json
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+OPTION_KEYS = ("A", "B", "C", "D", "E")
+DEFAULT_MAX_ENTRIES = 32
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def is_unanswered(question: dict) -> bool:
+    return not question.get("correct_answers")
+
+
+class ParsedExam:
+    """
+    One exam with its render data and indexes. Question numbers are 1-based positions;
+    the lists of indexes are sorted, so "next" lookups are a bisect.
+    """
+
+    def __init__(self, exam: dict, digest: str):
+        self.exam = exam
+        self.content_hash = digest
+        self.metadata = exam.get("metadata", {})
+        self.questions = exam.get("content", {}).get("questions", [])
+
+        self.render = []
+        self.with_image = []
+        self.unanswered = []
+        for index, question in enumerate(self.questions):
+            options = question.get("options", {}) or {}
+            correct_answers = question.get("correct_answers", [])
+            self.render.append(
+                {
+                    "number": index + 1,
+                    "text": question.get("question", ""),
+                    "options": [(key, options[key]) for key in OPTION_KEYS if key in options],
+                    "answers": ", ".join(correct_answers),
+                    "image_url": question.get("image_url"),
+                }
+            )
+            if question.get("image_url"):
+                self.with_image.append(index)
+            if is_unanswered(question):
+                self.unanswered.append(index)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def index_of(self, number: int) -> int | None:
+        return number - 1 if 1 <= number <= len(self.questions) else None
+
+    @staticmethod
+    def _next(indexes: list[int], after: int) -> int | None:
+        position = bisect_right(indexes, after)
+        return indexes[position] if position < len(indexes) else None
+
+    def next_unanswered(self, after: int = -1) -> int | None:
+        """First unanswered question after index after, wrapping around to the start."""
+        found = self._next(self.unanswered, after)
+        return found if found is not None else self._next(self.unanswered, -1)
+
+    def next_with_image(self, after: int = -1) -> int | None:
+        return self._next(self.with_image, after)
+
+
+class ExamCache:
+    """LRU of ParsedExam objects keyed by content hash; safe to share between sessions."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, digest: str) -> ParsedExam | None:
+        with self._lock:
+            parsed = self._entries.get(digest)
+            if parsed is not None:
+                self._entries.move_to_end(digest)
+            return parsed
+
+    def parse(self, raw: bytes) -> ParsedExam:
+        digest = content_hash(raw)
+        parsed = self.lookup(digest)
+        if parsed is not None:
+            return parsed
+        parsed = ParsedExam(json.loads(raw), digest)
+        with self._lock:
+            self._entries[digest] = parsed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return parsed
@@ -0,0 +1,102 @@
+"""
+Shared Google Drive and Sheets clients.
+
+Each service is built once per GoogleClients instance from the discovery document bundled
+with google-api-python-client, so no discovery request or credential setup happens per
+call. Requests go through one pooled httplib2 connection per thread (service objects share
+an Http otherwise, which is not thread-safe), and execute() retries 429 and 5xx responses
+with exponential backoff.
+"""
+
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+import google_auth_httplib2
+import httplib2
+from google.auth.credentials import AnonymousCredentials
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+
+SCOPES = [
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/spreadsheets",
+]
+DEFAULT_NUM_RETRIES = 5
+DEFAULT_TIMEOUT = 60
+
+
+class GoogleClients:
+    """
+    Drive v3 and Sheets v4 services sharing one set of credentials.
+    api_endpoint sends every request to that root URL instead of googleapis.com, e.g. the
+    local stand-in in devtools/fake_google_api.py; without credentials_info the requests
+    are then sent unauthenticated.
+    """
+
+    def __init__(
+        self,
+        credentials_info=None,
+        api_endpoint: str | None = None,
+        num_retries: int = DEFAULT_NUM_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        if credentials_info is not None:
+            self.credentials = service_account.Credentials.from_service_account_info(
+                dict(credentials_info), scopes=SCOPES
+            )
+        elif api_endpoint is not None:
+            self.credentials = AnonymousCredentials()
+        else:
+            raise ValueError("Google service account credentials are not configured.")
+
+        self.api_endpoint = urlsplit(api_endpoint) if api_endpoint else None
+        self.num_retries = num_retries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._services = {}
+
+    def _thread_http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=self.timeout)
+            )
+            self._local.http = http
+        return http
+
+    def _build_request(self, _http, *args, **kwargs):
+        # The service's own Http is ignored in favour of this thread's pooled one.
+        request = HttpRequest(self._thread_http(), *args, **kwargs)
+        if self.api_endpoint is not None:
+            parts = urlsplit(request.uri)
+            request.uri = urlunsplit(
+                (self.api_endpoint.scheme, self.api_endpoint.netloc, parts.path, parts.query, "")
+            )
+        return request
+
+    def service(self, name: str, version: str):
+        key = (name, version)
+        with self._lock:
+            if key not in self._services:
+                self._services[key] = build(
+                    name,
+                    version,
+                    credentials=self.credentials,
+                    requestBuilder=self._build_request,
+                    cache_discovery=False,
+                )
+            return self._services[key]
+
+    @property
+    def drive(self):
+        return self.service("drive", "v3")
+
+    @property
+    def sheets(self):
+        return self.service("sheets", "v4")
+
+    def execute(self, request):
+        """Executes request, retrying 429 and 5xx responses with exponential backoff."""
+        return request.execute(num_retries=self.num_retries)
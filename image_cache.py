@@ -0,0 +1,152 @@
+"""
+Two-tier LRU cache for remote question images, keyed by URL.
+
+Recently shown images stay in memory, everything fetched is kept on disk, and both tiers
+evict their least recently used entries once they exceed their byte budget. Fetches run on
+a small thread pool so upcoming images can be prefetched while a question is on screen.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.request import urlopen
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 30
+
+
+def fetch_url(url: str, timeout: float = DEFAULT_TIMEOUT) -> bytes:
+    with urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+class ImageCache:
+    """
+    get() returns the bytes for a URL, waiting for the network only on a miss;
+    prefetch() starts fetching URLs in the background and returns immediately.
+    fetch(url) -> bytes can be replaced, e.g. by a stub.
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        disk_bytes: int = DEFAULT_DISK_BYTES,
+        workers: int = DEFAULT_WORKERS,
+        fetch=fetch_url,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-cache")
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        self._in_flight = {}
+        self.fetch_count = 0
+
+        # Rebuild the disk LRU order from modification times, which get() refreshes.
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _mtime, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_size += size
+        with self._lock:
+            self._evict_disk()
+
+    def _disk_name(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _remember(self, url: str, data: bytes):
+        if url in self._memory:
+            self._memory_size -= len(self._memory.pop(url))
+        if len(data) > self.memory_bytes:
+            return
+        self._memory[url] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _url, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_bytes and self._disk:
+            name, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _lookup(self, url: str) -> bytes | None:
+        """Memory, then disk; must be called with the lock held."""
+        data = self._memory.get(url)
+        if data is not None:
+            self._memory.move_to_end(url)
+            return data
+        name = self._disk_name(url)
+        if name in self._disk:
+            path = self.cache_dir / name
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except FileNotFoundError:
+                self._disk_size -= self._disk.pop(name)
+                return None
+            self._disk.move_to_end(name)
+            self._remember(url, data)
+            return data
+        return None
+
+    def _download(self, url: str) -> bytes:
+        try:
+            data = self.fetch(url)
+            name = self._disk_name(url)
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as temp_file:
+                temp_file.write(data)
+            os.replace(temp_file.name, self.cache_dir / name)
+            with self._lock:
+                self.fetch_count += 1
+                if name in self._disk:
+                    self._disk_size -= self._disk.pop(name)
+                self._disk[name] = len(data)
+                self._disk_size += len(data)
+                self._evict_disk()
+                self._remember(url, data)
+            return data
+        finally:
+            with self._lock:
+                self._in_flight.pop(url, None)
+
+    def _future(self, url: str):
+        """Returns (cached bytes, None) or (None, future of the fetch)."""
+        with self._lock:
+            data = self._lookup(url)
+            if data is not None:
+                return data, None
+            future = self._in_flight.get(url)
+            if future is None:
+                future = self._executor.submit(self._download, url)
+                self._in_flight[url] = future
+            return None, future
+
+    def get(self, url: str, timeout: float | None = None) -> bytes:
+        data, future = self._future(url)
+        return data if future is None else future.result(timeout)
+
+    def prefetch(self, urls):
+        for url in urls:
+            self._future(url)
@@ -0,0 +1,102 @@
+"""
+Prepares question images for upload.
+
+Small web-ready images are uploaded as they are. Anything larger is turned upright
+(EXIF orientation), downscaled to MAX_DIMENSION and re-encoded as WebP or JPEG, and the
+original is kept whenever re-encoding would not make it smaller. A thumbnail is produced
+for the editor previews.
+"""
+
+import io
+
+from PIL import Image, ImageOps
+
+MAX_DIMENSION = 1600
+MAX_ORIGINAL_BYTES = 300 * 1024
+THUMBNAIL_SIZE = 300
+DEFAULT_FORMAT = "WEBP"
+DEFAULT_QUALITY = 80
+THUMBNAIL_QUALITY = 70
+WEB_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+IMAGE_FIELDS = ("image_width", "image_height", "image_bytes")
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    image_format = image_format.upper()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if image_format == "JPEG":
+        if has_alpha:
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, "white")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options = {"quality": quality, "optimize": True, "progressive": True}
+    else:
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        options = {"quality": quality, "method": 4}
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def prepare_image(
+    data: bytes,
+    max_dimension: int = MAX_DIMENSION,
+    max_original_bytes: int = MAX_ORIGINAL_BYTES,
+    image_format: str = DEFAULT_FORMAT,
+    quality: int = DEFAULT_QUALITY,
+    thumbnail_size: int = THUMBNAIL_SIZE,
+) -> dict:
+    """
+    Returns the bytes to upload with their format, width, height and size, the size of the
+    original, and a thumbnail no larger than thumbnail_size on either side.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source_format = (source.format or "").upper()
+        orientation = source.getexif().get(0x0112, 1)
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    original_size = image.size
+
+    keep_original = (
+        len(data) <= max_original_bytes
+        and max(image.size) <= max_dimension
+        and source_format in WEB_FORMATS
+        and orientation == 1
+    )
+    if keep_original:
+        output, output_format = data, source_format
+    else:
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        output, output_format = _encode(image, image_format, quality), image_format.upper()
+        # Re-encoding an upright, already small image can make it bigger.
+        if (
+            len(output) >= len(data)
+            and source_format in WEB_FORMATS
+            and orientation == 1
+            and image.size == original_size
+        ):
+            output, output_format = data, source_format
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+
+    return {
+        "data": output,
+        "format": output_format.lower(),
+        "width": image.width,
+        "height": image.height,
+        "bytes": len(output),
+        "original_bytes": len(data),
+        "thumbnail": _encode(thumbnail, image_format, THUMBNAIL_QUALITY),
+    }
+
+
+def image_fields(prepared: dict) -> dict:
+    """The fields recorded next to image_url in the question JSON."""
+    return dict(zip(IMAGE_FIELDS, (prepared["width"], prepared["height"], prepared["bytes"])))
@@ -0,0 +1,89 @@
+"""
+Content-addressed, background image uploads.
+
+Images are keyed by the SHA-256 of their bytes. A key that was uploaded once (in this
+process or, through the JSONL cache file, in an earlier one) is never uploaded again, and
+concurrent requests for the same key share one in-flight upload.
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_WORKERS = 4
+
+
+def image_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageUploadCache:
+    """
+    Maps image bytes to the URL returned by uploader(data, key).
+    submit() never blocks: it returns the key and uploads on a thread pool when needed;
+    url() and error() poll the outcome and result() waits for it.
+    """
+
+    def __init__(self, uploader, cache_path=None, workers: int = DEFAULT_WORKERS):
+        self.uploader = uploader
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-upload")
+        self._lock = threading.Lock()
+        self._urls = {}
+        self._in_flight = {}
+        self.upload_count = 0
+        if self.cache_path is not None and self.cache_path.is_file():
+            with self.cache_path.open("r", encoding="utf-8") as cache_file:
+                for line in cache_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._urls[entry["sha256"]] = entry["secure_url"]
+
+    def submit(self, data: bytes) -> str:
+        key = image_key(data)
+        with self._lock:
+            if key in self._urls:
+                return key
+            future = self._in_flight.get(key)
+            # A failed upload is retried on the next submit.
+            if future is None or (future.done() and future.exception() is not None):
+                self._in_flight[key] = self._executor.submit(self._upload, key, data)
+        return key
+
+    def _upload(self, key: str, data: bytes) -> str:
+        url = self.uploader(data, key)
+        with self._lock:
+            self.upload_count += 1
+            self._urls[key] = url
+            self._in_flight.pop(key, None)
+            if self.cache_path is not None:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.cache_path.open("a", encoding="utf-8") as cache_file:
+                    cache_file.write(json.dumps({"sha256": key, "secure_url": url}) + "\n")
+        return url
+
+    def url(self, key: str) -> str | None:
+        with self._lock:
+            return self._urls.get(key)
+
+    def error(self, key: str) -> BaseException | None:
+        with self._lock:
+            future = self._in_flight.get(key)
+        if future is None or not future.done():
+            return None
+        return future.exception()
+
+    def result(self, key: str, timeout: float | None = None) -> str:
+        """Waits for the upload of key and returns its URL; re-raises the upload error."""
+        with self._lock:
+            if key in self._urls:
+                return self._urls[key]
+            future = self._in_flight.get(key)
+        if future is None:
+            raise KeyError(f"No upload was submitted for image {key}.")
+        return future.result(timeout)
+
+    def upload(self, data: bytes, timeout: float | None = None) -> str:
+        return self.result(self.submit(data), timeout)
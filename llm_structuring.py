@@ -0,0 +1,230 @@
+"""
+LLM-assisted structuring of raw exam text into the content.questions schema.
+
+Raw question blocks (OCR or PDF text, one block per question) are sent in batches, one
+chat completion per batch, with at most max_concurrency requests in flight. Responses are
+cached on disk under a hash of the model and the full prompt, so a re-run only pays for
+batches it has not seen. Rate limits (429) and server errors are retried by the OpenAI
+SDK with exponential backoff, honouring Retry-After.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import openai
+
+from pipeline_timing import PipelineTimer
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_TIMEOUT = 120
+OPTION_LETTERS = "ABCDE"
+# A question number may skip this many numbers (e.g. an unreadable question) and still count.
+MAX_NUMBER_GAP = 5
+
+SYSTEM_PROMPT = """You turn raw multiple-choice exam questions, extracted from PDFs or OCR, into JSON.
+The user sends {"questions": [...]} with one raw text per question. Reply with
+{"questions": [...]} holding exactly one object per input, in the same order:
+{"question": "<stem without its number>", "options": {"A": "...", "B": "..."}, "correct_answers": ["B"]}
+Options use the letters A to E in order, without their "A-" / "A)" markers. Keep the original
+language and wording; only fix obvious OCR breaks such as hyphenated line ends.
+correct_answers lists the letters marked as correct in the text, or is empty."""
+
+_QUESTION_LINE = re.compile(
+    r"^\s*(?:Q(?:uestion)?\s*\.?\s*(?P<q>\d{1,4})|(?P<deg>\d{1,4})\s*°|(?P<dot>\d{1,4})\s*(?P<sep>[.)])(?=\s|$))",
+    re.I | re.M,
+)
+
+
+def question_blocks(raw_text: str) -> list[str]:
+    """
+    Splits raw exam text into one block per numbered question; text before the first is
+    dropped. As in digitalization.parse_questions, a line only starts a question when its
+    number follows the previous one and it uses the first question's numbering style
+    ("n°", "Qn", "n." or "n)"), so numbered statements inside a question stay in its block.
+    """
+    starts = []
+    last_number = 0
+    numbering = None
+    for match in _QUESTION_LINE.finditer(raw_text):
+        number = int(match.group("q") or match.group("deg") or match.group("dot"))
+        style = "q" if match.group("q") else "deg" if match.group("deg") else "dot" + match.group("sep")
+        if last_number < number <= last_number + MAX_NUMBER_GAP and numbering in (None, style):
+            starts.append(match.start())
+            last_number = number
+            numbering = style
+    ends = starts[1:] + [len(raw_text)]
+    return [raw_text[start:end].strip() for start, end in zip(starts, ends) if raw_text[start:end].strip()]
+
+
+def normalize_question(item) -> dict:
+    """One model answer in the Create Exam question schema; unknown fields are dropped."""
+    if not isinstance(item, dict):
+        raise ValueError(f"Expected a question object, got {type(item).__name__}")
+    raw_options = item.get("options") or {}
+    if not isinstance(raw_options, dict):
+        raise ValueError("Question options must be an object")
+    options = {
+        letter: str(raw_options[letter]).strip()
+        for letter in OPTION_LETTERS
+        if raw_options.get(letter) not in (None, "")
+    }
+    answers = item.get("correct_answers") or []
+    if isinstance(answers, str):
+        answers = list(answers)
+    correct_answers = []
+    for answer in answers:
+        letter = str(answer).strip().upper()
+        if letter in options and letter not in correct_answers:
+            correct_answers.append(letter)
+    return {
+        "question": str(item.get("question", "")).strip(),
+        "options": options,
+        "correct_answers": correct_answers,
+        "isAnswered": bool(correct_answers),
+    }
+
+
+class ResponseCache:
+    """One JSON file per response under cache_dir, named by the request's hash."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str):
+        try:
+            return json.loads((self.cache_dir / f"{key}.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, value):
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as temp_file:
+            json.dump(value, temp_file, ensure_ascii=False)
+        os.replace(temp_file.name, self.cache_dir / f"{key}.json")
+
+
+class LLMStructurer:
+    """
+    Structures raw question texts with a chat model.
+    base_url points the client at another OpenAI-compatible server, e.g. the local stub in
+    devtools/llm_stub_server.py, which needs no API key.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        model: str = DEFAULT_MODEL,
+        cache_dir=None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        if not api_key and not base_url:
+            raise ValueError("OpenAI API key is not configured.")
+        self.client = openai.OpenAI(
+            api_key=api_key or "local-stub",
+            base_url=base_url,
+            max_retries=max_retries,
+            timeout=timeout,
+        )
+        self.model = model
+        self.cache = ResponseCache(cache_dir) if cache_dir is not None else None
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    def _messages(self, texts: list[str]) -> list[dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps({"questions": texts}, ensure_ascii=False)},
+        ]
+
+    def cache_key(self, messages: list[dict]) -> str:
+        request = {"model": self.model, "messages": messages}
+        return hashlib.sha256(json.dumps(request, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _structure_batch(self, texts: list[str]) -> tuple[list[dict], bool]:
+        """Returns the batch's questions and whether they came from the cache."""
+        messages = self._messages(texts)
+        key = self.cache_key(messages)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, True
+
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+        content = response.choices[0].message.content or ""
+        try:
+            items = json.loads(content)["questions"]
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f"The model did not return a questions list: {exc}") from exc
+        if not isinstance(items, list) or len(items) != len(texts):
+            got = len(items) if isinstance(items, list) else type(items).__name__
+            raise ValueError(f"Expected {len(texts)} questions, the model returned {got}")
+        questions = [normalize_question(item) for item in items]
+
+        if self.cache is not None:
+            self.cache.put(key, questions)
+        return questions, False
+
+    def structure(self, texts: list[str], progress=None) -> dict:
+        """
+        Structures texts in order. A batch that still fails after the SDK's retries keeps
+        its raw texts as question stems with no options and is listed under failed_batches.
+        progress(done, total), if given, is called after each batch.
+        """
+        timer = PipelineTimer()
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        questions = []
+        failed_batches = []
+        cache_hits = 0
+
+        with timer.stage("total"), ThreadPoolExecutor(
+            max_workers=max(1, self.max_concurrency), thread_name_prefix="llm-structuring"
+        ) as executor:
+            futures = [executor.submit(self._structure_batch, batch) for batch in batches]
+            done = 0
+            for index, (batch, future) in enumerate(zip(batches, futures)):
+                try:
+                    batch_questions, cached = future.result()
+                except (openai.OpenAIError, ValueError) as exc:
+                    failed_batches.append(
+                        {"batch": index, "first_question": index * self.batch_size, "error": str(exc)}
+                    )
+                    batch_questions = [normalize_question({"question": text}) for text in batch]
+                else:
+                    cache_hits += cached
+                questions.extend(batch_questions)
+                done += len(batch)
+                if progress is not None:
+                    progress(done, len(texts))
+
+        return {
+            "questions": questions,
+            "batches": len(batches),
+            "cache_hits": cache_hits,
+            "failed_batches": failed_batches,
+            "timings": timer.to_dict(),
+        }
+
+    def structure_exam(self, raw_text: str, metadata: dict | None = None, progress=None) -> dict:
+        """An exam JSON ({"metadata", "content": {"questions"}}) from raw exam text, plus a run summary."""
+        result = self.structure(question_blocks(raw_text), progress)
+        exam = {"metadata": dict(metadata or {}), "content": {"questions": result.pop("questions")}}
+        return {"exam": exam, **result}
@@ -0,0 +1,218 @@
+"""
+Near-duplicate detection for cleaned exam questions.
+
+Each question (stem plus options) is shingled into word n-grams and summarised by a
+MinHash signature built from 16-bit slices of one BLAKE2b digest per shingle. Signatures are split into bands and bucketed (locality-sensitive
+hashing), so only questions that share a bucket are ever compared and the cost grows
+roughly linearly with the corpus instead of with the number of pairs.
+"""
+
+import hashlib
+import json
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from pathlib import Path
+
+CANONICAL_FIELD = "canonical_question_id"
+
+_VALUES_PER_DIGEST = 32
+_WORD = re.compile(r"\w+")
+
+
+def question_text(question: dict) -> str:
+    options = question.get("options", {}) or {}
+    option_text = " ".join(
+        options[key] for key in sorted(options) if isinstance(options[key], str)
+    )
+    return f"{question.get('question', '')} {option_text}"
+
+
+def question_id(dest_rel, index: int) -> str:
+    return f"{Path(dest_rel).as_posix()}#{index + 1}"
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over question texts.
+    With the defaults (32 hash functions in 8 bands of 4 rows) pairs around 0.6 Jaccard
+    similarity start to share a bucket; candidates are then kept only when their
+    estimated similarity reaches threshold.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 32,
+        bands: int = 8,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Each salted 64-byte digest yields 32 independent 16-bit hash values.
+        digest_count = -(-num_perm // _VALUES_PER_DIGEST)
+        self._salts = [f"{seed}:{index}".encode("utf-8")[:16] for index in range(digest_count)]
+        self.ids = []
+        self.signatures = []
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+
+    def shingles(self, text: str) -> set[bytes]:
+        words = _WORD.findall(text.lower())
+        size = self.shingle_size
+        if len(words) <= size:
+            grams = [" ".join(words)] if words else []
+        else:
+            grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+        return {gram.encode("utf-8") for gram in grams}
+
+    def signature(self, shingles: set[bytes]):
+        if not shingles:
+            return None
+        salts = self._salts
+        rows = [
+            array(
+                "H",
+                b"".join(hashlib.blake2b(gram, digest_size=64, salt=salt).digest() for salt in salts),
+            )
+            for gram in shingles
+        ]
+        # Column-wise minimum over all shingles, one column per hash function.
+        return array("H", map(min, zip(*rows)))[: self.num_perm]
+
+    def add(self, item_id: str, text: str):
+        signature = self.signature(self.shingles(text))
+        if signature is None:
+            return
+        index = len(self.ids)
+        self.ids.append(item_id)
+        self.signatures.append(signature)
+        rows = self.rows
+        for band, buckets in enumerate(self._buckets):
+            start = band * rows
+            buckets[zlib.crc32(signature[start:start + rows].tobytes())].append(index)
+
+    def similarity(self, first: int, second: int) -> float:
+        matches = sum(
+            a == b for a, b in zip(self.signatures[first], self.signatures[second])
+        )
+        return matches / self.num_perm
+
+    def clusters(self) -> list[dict]:
+        """
+        Groups indexed questions whose estimated similarity reaches the threshold.
+        Each cluster names its earliest question as canonical and lists the others with
+        their similarity to it.
+        """
+        parent = list(range(len(self.ids)))
+
+        def find(index):
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        compared = set()
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                # Compare against one representative per cluster seen in this bucket
+                # rather than every pair, so a bucket of identical questions stays linear.
+                representatives = [members[0]]
+                for member in members[1:]:
+                    for representative in representatives:
+                        if find(member) == find(representative):
+                            break
+                        pair = (representative, member)
+                        if pair in compared:
+                            continue
+                        compared.add(pair)
+                        if self.similarity(representative, member) >= self.threshold:
+                            parent[find(member)] = find(representative)
+                            break
+                    else:
+                        representatives.append(member)
+
+        members_by_root = defaultdict(list)
+        for index in range(len(self.ids)):
+            members_by_root[find(index)].append(index)
+
+        clusters = []
+        for root, members in sorted(members_by_root.items(), key=lambda item: min(item[1])):
+            if len(members) < 2:
+                continue
+            canonical = members[0]
+            clusters.append(
+                {
+                    "canonical_id": self.ids[canonical],
+                    "members": [
+                        {
+                            "id": self.ids[member],
+                            "similarity": round(self.similarity(canonical, member), 3),
+                        }
+                        for member in members[1:]
+                    ],
+                }
+            )
+        return clusters
+
+
+def find_near_duplicates(output_dir, dest_rels, **index_options) -> list[dict]:
+    """Indexes every question of the cleaned files dest_rels (relative to output_dir)."""
+    output_dir = Path(output_dir)
+    index = NearDuplicateIndex(**index_options)
+    for dest_rel in dest_rels:
+        data = json.loads((output_dir / dest_rel).read_text(encoding="utf-8"))
+        for position, question in enumerate(data.get("content", {}).get("questions", [])):
+            index.add(question_id(dest_rel, position), question_text(question))
+    return index.clusters()
+
+
+def collapse_near_duplicates(output_dir, dest_rels, clusters, serialize) -> int:
+    """
+    Points every non-canonical member of a cluster at its canonical question through the
+    canonical_question_id field, and drops stale links left by earlier runs.
+    Returns the number of files rewritten.
+    """
+    output_dir = Path(output_dir)
+    canonical_by_id = {
+        member["id"]: cluster["canonical_id"]
+        for cluster in clusters
+        for member in cluster["members"]
+    }
+
+    rewritten = 0
+    for dest_rel in dest_rels:
+        output_path = output_dir / dest_rel
+        data = json.loads(output_path.read_text(encoding="utf-8"))
+        changed = False
+        for position, question in enumerate(data.get("content", {}).get("questions", [])):
+            canonical = canonical_by_id.get(question_id(dest_rel, position))
+            if question.get(CANONICAL_FIELD) == canonical:
+                continue
+            if canonical is None:
+                del question[CANONICAL_FIELD]
+            else:
+                question[CANONICAL_FIELD] = canonical
+            changed = True
+        if changed:
+            output_path.write_text(serialize(data), encoding="utf-8")
+            rewritten += 1
+    return rewritten
+
+
+def format_clusters(clusters: list[dict]) -> str:
+    lines = []
+    for cluster in clusters:
+        lines.append(cluster["canonical_id"])
+        for member in cluster["members"]:
+            lines.append(f"  = {member['id']} (similarity {member['similarity']:.3f})")
+    return "\n".join(lines)
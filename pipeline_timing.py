@@ -0,0 +1,95 @@
+"""
+Stage timers and profiling hooks for the cleaning pipeline.
+"""
+
+import cProfile
+import heapq
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class PipelineTimer:
+    """
+    Accumulates wall and CPU time per named stage and keeps the slowest files.
+    on_stage, when given, is called as on_stage(name, wall_seconds, cpu_seconds) after every
+    stage, which is enough to forward spans to an external tracer.
+    """
+
+    def __init__(self, slowest_files: int = 10, on_stage=None):
+        self.slowest_files = slowest_files
+        self.on_stage = on_stage
+        self.stages = {}
+        self._slowest = []
+
+    @contextmanager
+    def stage(self, name: str):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(
+                name,
+                time.perf_counter() - wall_start,
+                time.process_time() - cpu_start,
+            )
+
+    def add(self, name: str, wall: float, cpu: float, calls: int = 1):
+        totals = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+        totals["wall_seconds"] += wall
+        totals["cpu_seconds"] += cpu
+        totals["calls"] += calls
+        if self.on_stage is not None:
+            self.on_stage(name, wall, cpu)
+
+    def record_file(self, name: str, seconds: float):
+        if self.slowest_files <= 0:
+            return
+        entry = (seconds, name)
+        if len(self._slowest) < self.slowest_files:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def merge(self, timings: dict):
+        """Adds timings produced by another timer's to_dict, e.g. from a worker process."""
+        for name, totals in timings.get("stages", {}).items():
+            stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+            stage["wall_seconds"] += totals["wall_seconds"]
+            stage["cpu_seconds"] += totals["cpu_seconds"]
+            stage["calls"] += totals["calls"]
+            if self.on_stage is not None:
+                self.on_stage(name, totals["wall_seconds"], totals["cpu_seconds"])
+        for entry in timings.get("slowest_files", []):
+            self.record_file(entry["file"], entry["seconds"])
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {name: dict(totals) for name, totals in self.stages.items()},
+            "slowest_files": [
+                {"file": name, "seconds": seconds}
+                for seconds, name in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+    def write(self, path) -> Path:
+        path = Path(path)
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        return path
+
+
+@contextmanager
+def profiled(enabled: bool, output_path):
+    """Runs the block under cProfile when enabled and dumps pstats to output_path."""
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(output_path))
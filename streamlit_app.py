@@ -1,32 +1,46 @@
 import streamlit as st
 import json
-import base64
+import copy
+import gzip
+import hashlib
 import io
 import time
 import os
+import pstats
 import re
-import zipfile
 import tempfile
+import zipfile
 from pathlib import Path
-from urllib.request import urlopen
-from PIL import Image
-
-# Google / Cloud Libraries
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaInMemoryUpload
 
+# Cloud Libraries
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 
-from datetime import datetime
-
 APP_DIR = Path(__file__).resolve().parent
 
-from clean_directory import MedicalDataCleaner
+from answer_filling import show_answer_filling_page
+from clean_directory import MedicalDataCleaner, iter_archive_exams
+from clean_jobs import JobManager
+from correction_linking import show_correction_linking_page
+from digitalization import (
+    PdfExamExtractor,
+    attach_question_images,
+    select_question_images,
+    strip_page_furniture,
+)
+from google_clients import GoogleClients
+from bulk_publish import append_rows, journal_path_for, metadata_row, publish_exams, upload_json
+from exam_cache import ExamCache
+from image_cache import ImageCache
+from image_pipeline import IMAGE_FIELDS, image_fields, prepare_image
+from image_uploads import ImageUploadCache
+from llm_structuring import LLMStructurer
+from pipeline_timing import PipelineTimer, profiled
 
 CLOUDINARY_CONFIGURED = False
+IMAGE_PREFETCH_AHEAD = 3
+EDITOR_PAGE_SIZES = [10, 20, 50, 100]
 
 
 # ---------------------------
@@ -63,113 +77,112 @@ def configure_cloudinary():
 # ---------------------------
 # 3. Google APIs Setup
 # ---------------------------
+@st.cache_resource
+def get_google_clients():
+    """
+    Built once per process and shared by every session.
+    GOOGLE_API_ENDPOINT points the clients at a local stand-in such as
+    devtools/fake_google_api.py instead of googleapis.com.
+    """
+    api_endpoint = os.environ.get("GOOGLE_API_ENDPOINT")
+    credentials_info = st.secrets.get("gcp_service_account") if not api_endpoint else None
+    return GoogleClients(credentials_info, api_endpoint=api_endpoint)
+
 def get_gdrive_service():
-    credentials_info = st.secrets["gcp_service_account"]
-    credentials = service_account.Credentials.from_service_account_info(
-        credentials_info,
-        scopes=["https://www.googleapis.com/auth/drive"]
-    )
-    return build("drive", "v3", credentials=credentials)
+    return get_google_clients().drive
 
 def get_gsheet_service():
-    credentials_info = st.secrets["gcp_service_account"]
-    credentials = service_account.Credentials.from_service_account_info(
-        credentials_info,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    return build("sheets", "v4", credentials=credentials)
+    return get_google_clients().sheets
 
 def upload_json_to_drive(json_data, filename):
     """Uploads a JSON string to a specified Google Drive folder."""
-    drive_service = get_gdrive_service()
-
     folder_id = st.secrets["gcp_drive"]["folder_id"]  # Where we want to upload
-    media = MediaInMemoryUpload(json_data.encode('utf-8'), mimetype='application/json')
-
-    file_metadata = {
-        'name': filename,
-        'parents': [folder_id]
-    }
-
-    uploaded_file = drive_service.files().create(
-        body=file_metadata,
-        media_body=media,
-        fields='id, webViewLink'
-    ).execute()
-
-    return uploaded_file  # returns a dict with 'id' and 'webViewLink'
+    # returns a dict with 'id' and 'webViewLink'
+    return upload_json(get_google_clients(), folder_id, json_data.encode('utf-8'), filename)
 
 
 def append_metadata_to_gsheet(exam_data):
     """
     Appends exam info (metadata + question count + timestamp) to a Google Sheet.
-    Make sure your sheet has a tab named "Metadata" or change the range below.
+    Make sure your sheet has a tab named "Metadata" or change METADATA_RANGE.
     """
-    sheets_service = get_gsheet_service()
     spreadsheet_id = st.secrets["gcp_sheets"]["spreadsheet_id"]
-
-    metadata   = exam_data.get("metadata", {})
-    questions  = exam_data.get("content", {}).get("questions", [])
-    timestamp  = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    q_count    = len(questions)
-
-    # Extract metadata fields and cast them to strings
-    unique_id = str(metadata.get("unique_id", ""))
-    school = str(metadata.get("school", ""))
-    exam_year = str(metadata.get("exam_year", ""))
-    exam_month = str(metadata.get("exam_month", ""))
-    exam_variable = str(metadata.get("exam_variable", ""))
-    subject_year = str(metadata.get("subject_year", ""))
-    semester = str(metadata.get("semester", ""))
-    topic = str(metadata.get("topic", ""))
-
-    # (Optional) entire metadata as JSON
-    import json
-    metadata_json_str = json.dumps(metadata)
-
-    # Build the row to append (Columns: A to K)
-    new_row = [
-        timestamp,          # A
-        unique_id,          # B
-        school,             # C
-        exam_year,          # D
-        exam_month,         # E
-        exam_variable,      # F
-        subject_year,       # G
-        semester,           # H
-        topic,              # I
-        q_count,            # J
-        metadata_json_str   # K (optional)
-    ]
-
-    body = {
-        "values": [new_row]
-    }
-
-    # Append to row range A1:K. If your sheet is named differently, change "Metadata"
-    result = sheets_service.spreadsheets().values().append(
-        spreadsheetId=spreadsheet_id,
-        range="Metadata!A1:K",
-        valueInputOption="USER_ENTERED",
-        insertDataOption="INSERT_ROWS",
-        body=body
-    ).execute()
-
-    return result
+    return append_rows(get_google_clients(), spreadsheet_id, [metadata_row(exam_data)])
 
 
 # ---------------------------
 # 4. Other Utility Functions
 # ---------------------------
-def upload_image_to_cloudinary(image):
-    if image is not None:
-        configure_cloudinary()
-        buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
-        buffer.seek(0)
-        response = cloudinary.uploader.upload(buffer)
-        return response['secure_url']
-    return None
+def upload_bytes_to_cloudinary(data, key):
+    configure_cloudinary()
+    response = cloudinary.uploader.upload(io.BytesIO(data))
+    return response['secure_url']
+
+
+@st.cache_resource
+def get_image_upload_cache():
+    """Shared by every session; the JSONL file keeps known uploads across restarts."""
+    cache_path = Path(tempfile.gettempdir()) / "medquest_image_uploads.jsonl"
+    return ImageUploadCache(upload_bytes_to_cloudinary, cache_path=cache_path)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def prepare_question_image(image_bytes):
+    """Downscaled upload bytes, thumbnail and dimensions, computed once per distinct image."""
+    return prepare_image(image_bytes)
+
+
+def resolve_image_uploads(questions, pending_uploads) -> dict:
+    """
+    Waits for the background uploads in pending_uploads (question index -> image key).
+    Returns {question index: error} for the uploads that failed; those stay pending.
+    """
+    uploads = get_image_upload_cache()
+    failed = {}
+    for index, key in list(pending_uploads.items()):
+        if index < len(questions):
+            try:
+                questions[index]["image_url"] = uploads.result(key)
+            except Exception as exc:
+                failed[index] = exc
+                continue
+        del pending_uploads[index]
+    return failed
+
+@st.cache_resource
+def get_image_cache():
+    """Question images fetched for Visualize Test, shared by every session."""
+    return ImageCache(Path(tempfile.gettempdir()) / "medquest_image_cache")
+
+
+@st.cache_resource
+def get_pdf_extractor():
+    """Extracted PDF pages are cached on disk, so re-importing an exam skips extraction."""
+    return PdfExamExtractor(Path(tempfile.gettempdir()) / "medquest_pdf_pages")
+
+
+@st.cache_resource
+def get_llm_structurer():
+    """
+    Responses are cached on disk by prompt and model. OPENAI_BASE_URL points the client at a
+    local stand-in such as devtools/llm_stub_server.py instead of the OpenAI API.
+    """
+    base_url = os.environ.get("OPENAI_BASE_URL")
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key and not base_url:
+        api_key = st.secrets.get("openai", {}).get("api_key")
+    return LLMStructurer(
+        api_key=api_key,
+        base_url=base_url,
+        cache_dir=Path(tempfile.gettempdir()) / "medquest_llm_cache",
+    )
+
+
+@st.cache_resource
+def get_exam_cache():
+    """Parsed exams by content hash, shared by every session."""
+    return ExamCache()
+
 
 def parse_options(options_text):
     options_list = options_text.split('\n')[:5]  # Limit to 5 options
@@ -180,6 +193,31 @@ def parse_options(options_text):
     return parsed_options
 
 
+def exam_download_bytes(exam_data, compact=False, use_gzip=False):
+    if compact:
+        json_bytes = json.dumps(exam_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    else:
+        json_bytes = json.dumps(exam_data, ensure_ascii=False, indent=2).encode("utf-8")
+    return gzip.compress(json_bytes, mtime=0) if use_gzip else json_bytes
+
+
+def edited_exams_zip(edited_exams, compact=False):
+    """ZIP of edited exams given as {"name", "data"} entries, one updated_<name> member each."""
+    buffer = io.BytesIO()
+    used_names = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for entry in edited_exams:
+            name = f"updated_{entry['name']}"
+            stem, suffix = os.path.splitext(name)
+            copy_number = 1
+            while name in used_names:
+                copy_number += 1
+                name = f"{stem}_{copy_number}{suffix}"
+            used_names.add(name)
+            archive.writestr(name, exam_download_bytes(entry["data"], compact))
+    return buffer.getvalue()
+
+
 def generate_unique_id(school, subject_year, semester, topic, exam_year, exam_month, exam_variable):
     semester_map = {
         "First Year":  {"S1": "S1",  "S2": "S2"},
@@ -194,73 +232,79 @@ def generate_unique_id(school, subject_year, semester, topic, exam_year, exam_mo
     return f"{semester_code}_{school}_{topic}_{exam_year_str}_{exam_month_str}_{exam_variable}".replace(" ", "_")
 
 
-def extract_zip_safely(zip_file, destination):
-    destination = destination.resolve()
-    for member in zip_file.infolist():
-        member_path = destination / member.filename
-        if not str(member_path.resolve()).startswith(str(destination)):
-            raise ValueError("The uploaded ZIP contains an invalid path.")
-    zip_file.extractall(destination)
-
-
-def build_cleaned_archive(cleaned_dir, reports):
-    archive_buffer = io.BytesIO()
-    with zipfile.ZipFile(archive_buffer, "w", zipfile.ZIP_DEFLATED) as archive:
-        for file_path in cleaned_dir.rglob("*"):
-            if file_path.is_file():
-                archive.write(
-                    file_path,
-                    arcname=str(Path("cleaned") / file_path.relative_to(cleaned_dir)),
-                )
-
-        for report_name, report_text in reports.items():
-            archive.writestr(str(Path("reports") / report_name), report_text)
-
-    archive_buffer.seek(0)
-    return archive_buffer.getvalue()
-
-
-def clean_uploaded_archive(uploaded_file, status_box=None):
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_root = Path(temp_dir)
-        extract_dir = temp_root / "input"
-        cleaned_dir = temp_root / "cleaned"
-        reports_dir = temp_root / "reports"
-
-        extract_dir.mkdir(parents=True, exist_ok=True)
-        cleaned_dir.mkdir(parents=True, exist_ok=True)
-        reports_dir.mkdir(parents=True, exist_ok=True)
-
-        if status_box is not None:
-            status_box.write("Extracting the uploaded ZIP archive.")
-
-        with zipfile.ZipFile(io.BytesIO(uploaded_file.getvalue())) as zip_file:
-            extract_zip_safely(zip_file, extract_dir)
+def clean_uploaded_archive(
+    uploaded_file,
+    status_box=None,
+    profile=False,
+    stage_hook=None,
+    progress=None,
+    archive_path=None,
+    source_filename=None,
+    structure=True,
+):
+    """
+    Cleans an uploaded ZIP archive. The cleaned archive is returned as archive_bytes, or
+    written to archive_path (with its SHA-256 in the result) when one is given.
+    structure=False leaves question stems and options as they are.
+    """
+    if status_box is not None:
+        status_box.write("Cleaning JSON files straight from the uploaded ZIP archive.")
+    source_filename = source_filename or uploaded_file.name
+
+    archive_target = archive_path if archive_path is not None else io.BytesIO()
+    cleaner = MedicalDataCleaner(stage_hook=stage_hook, structure=structure)
+    profile_text = None
+    with tempfile.TemporaryDirectory() as profile_dir:
+        profile_path = Path(profile_dir) / "clean.prof"
+        with profiled(profile, profile_path):
+            result = cleaner.process_zip(
+                uploaded_file, archive_target, stream_reports=True, progress=progress
+            )
+        if profile:
+            stats_buffer = io.StringIO()
+            pstats.Stats(str(profile_path), stream=stats_buffer).sort_stats("cumulative").print_stats(25)
+            profile_text = stats_buffer.getvalue()
+
+    timer = PipelineTimer(on_stage=stage_hook)
+    timer.merge(result["timings"])
+    with timer.stage("load_summary"):
+        if archive_path is not None:
+            with open(archive_path, "rb") as archive_file:
+                archive_output = {"archive_sha256": hashlib.file_digest(archive_file, "sha256").hexdigest()}
+            archive_source = archive_path
+        else:
+            archive_output = {"archive_bytes": archive_target.getvalue()}
+            archive_source = io.BytesIO(archive_output["archive_bytes"])
+        # Only the short summary is kept; the detailed JSONL reports stay inside the ZIP.
+        with zipfile.ZipFile(archive_source) as archive:
+            processing_report = archive.read(result["reports"]["processing_report.txt"]).decode("utf-8")
 
-        cleaner = MedicalDataCleaner()
-        if not any(cleaner.iter_json_files(extract_dir)):
-            raise ValueError("The uploaded ZIP does not contain any JSON files.")
+    return {
+        **result,
+        "timings": timer.to_dict(),
+        "profile": profile_text,
+        "processing_report": processing_report,
+        **archive_output,
+        "source_filename": source_filename,
+        "download_name": f"{Path(source_filename).stem}_cleaned.zip",
+    }
 
-        if status_box is not None:
-            status_box.write("Cleaning extracted JSON files.")
 
-        result = cleaner.process_directory(
-            extract_dir,
-            output_dir=cleaned_dir,
-            reports_dir=reports_dir,
-        )
-
-        if status_box is not None:
-            status_box.write("Packing the cleaned output for download.")
+def run_clean_job(source_path, archive_path, progress, source_filename, profile=False, structure=True):
+    return clean_uploaded_archive(
+        source_path,
+        profile=profile,
+        structure=structure,
+        progress=progress,
+        archive_path=archive_path,
+        source_filename=source_filename,
+    )
 
-        archive_bytes = build_cleaned_archive(cleaned_dir, result["reports"])
 
-    return {
-        **result,
-        "archive_bytes": archive_bytes,
-        "source_filename": uploaded_file.name,
-        "download_name": f"{Path(uploaded_file.name).stem}_cleaned.zip",
-    }
+@st.cache_resource
+def get_clean_job_manager():
+    """One bounded job pool per server process, shared by every session."""
+    return JobManager(Path(tempfile.gettempdir()) / "medquest_clean_jobs", run_clean_job)
 
 
 # ---------------------------
@@ -315,6 +359,204 @@ def show_metadata_form(metadata):
     return school, exam_year, exam_month, subject_year, semester, topic, exam_variable
 
 
+def show_question_image_upload(question, i, key_prefix):
+    uploaded_image = st.file_uploader(
+        f"Upload an image for question #{i+1}",
+        type=["png", "jpg", "jpeg"],
+        key=f"{key_prefix}_q{i}_image"
+    )
+    if uploaded_image:
+        # Uploaded once per distinct image, in the background.
+        prepared = prepare_question_image(uploaded_image.getvalue())
+        st.image(prepared["thumbnail"], caption="Uploaded Image", width=300)
+        question.update(image_fields(prepared))
+        uploads = get_image_upload_cache()
+        image_key = uploads.submit(prepared["data"])
+        image_url = uploads.url(image_key)
+        pending_uploads = st.session_state.setdefault("pending_image_uploads", {})
+        if image_url:
+            question['image_url'] = image_url
+            pending_uploads.pop(i, None)
+        elif uploads.error(image_key) is not None:
+            st.error(f"Image upload failed: {uploads.error(image_key)}")
+        else:
+            pending_uploads[i] = image_key
+            st.caption("Uploading image...")
+    elif 'image_url' in question:
+        st.image(question['image_url'], caption="Question Image", width=300)
+
+
+@st.fragment
+def edit_question(questions, i, key_prefix, allow_image_upload=False, expanded=False):
+    """
+    Widgets for one question. As a fragment, an edit here reruns only this question
+    instead of the whole page.
+    """
+    question = questions[i]
+    with st.expander(f"Question {i + 1}", expanded=expanded):
+        question['question'] = st.text_area(
+            f"Question Text #{i+1}",
+            question['question'],
+            height=100,
+            key=f"{key_prefix}_q{i}_text"
+        )
+
+        if allow_image_upload:
+            st.write("Parsed Question:")
+            st.text(question['question'])
+            show_question_image_upload(question, i, key_prefix)
+        elif 'image_url' in question:
+            st.image(question['image_url'], caption="Question Image", width=300)
+            if st.button(f"Remove Image for Question {i + 1}", key=f"{key_prefix}_remove_image_{i}"):
+                for field in ('image_url', *IMAGE_FIELDS):
+                    question.pop(field, None)
+                st.rerun(scope="fragment")
+
+        # Options input with automatic parsing
+        options_text = st.text_area(
+            "Options (one option per line, max 5 lines)",
+            value="\n".join(question.get('options', {}).values()),
+            height=150,
+            key=f"{key_prefix}_q{i}_options"
+        )
+        question['options'] = parse_options(options_text)
+
+        st.write("Parsed Options:")
+        for key, val in question['options'].items():
+            st.text(f"{key}: {val}")
+
+        correct_answers_input = st.text_input(
+            "Correct Answer(s) (e.g., ABC, DE, A)",
+            value="".join(question.get('correct_answers', [])),
+            key=f"{key_prefix}_q{i}_correct_input"
+        )
+        new_correct_answers = [ans for ans in correct_answers_input.upper()
+                               if ans in question['options']]
+        if new_correct_answers != question.get('correct_answers', []):
+            question['correct_answers'] = new_correct_answers
+            question['isAnswered'] = bool(new_correct_answers)
+
+        st.write("Parsed Correct Answer(s):")
+        st.text(", ".join(question['correct_answers']))
+
+
+def set_editor_page(page_key, page):
+    st.session_state[page_key] = page
+
+
+def show_question_editor(questions, key_prefix, allow_image_upload=False, expanded=False):
+    """
+    Paginated question editor shared by Create Exam and Edit JSON.
+    Only one page of questions gets widgets; questions on other pages keep their values
+    in the exam data.
+    """
+    total = len(questions)
+    page_key = f"{key_prefix}_editor_page"
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox(
+            "Questions per page", EDITOR_PAGE_SIZES, index=1, key=f"{key_prefix}_editor_page_size"
+        )
+    page_count = max(1, -(-total // page_size))
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    with col2:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key=page_key)
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    with col3:
+        st.write(f"Questions {start + 1}-{end} of {total}")
+
+    for i in range(start, end):
+        edit_question(questions, i, key_prefix, allow_image_upload, expanded)
+
+    col1, _, col3 = st.columns([1, 2, 1])
+    with col1:
+        if page > 1:
+            st.button(
+                "Previous Page", key=f"{key_prefix}_previous_page",
+                on_click=set_editor_page, args=(page_key, page - 1),
+            )
+    with col3:
+        if page < page_count:
+            st.button(
+                "Next Page", key=f"{key_prefix}_next_page",
+                on_click=set_editor_page, args=(page_key, page + 1),
+            )
+
+
+def show_pdf_import(questions):
+    """Fills the Create Exam questions from an exam PDF."""
+    uploaded_pdf = st.file_uploader("Upload exam PDF", type="pdf", key="create_pdf")
+    use_llm = st.checkbox(
+        "Structure with LLM",
+        value=False,
+        help="Send the extracted text to the language model instead of the rule-based parser.",
+    )
+    attach_images = st.checkbox(
+        "Upload embedded images",
+        value=True,
+        help="Attach each figure in the PDF to its nearest question; repeated logos are skipped.",
+    )
+    if uploaded_pdf is not None and st.button("Extract Questions"):
+        try:
+            with st.spinner("Extracting questions from the PDF..."):
+                extracted = get_pdf_extractor().extract(uploaded_pdf.getvalue())
+            if use_llm:
+                raw_text = "\n".join(
+                    line["text"]
+                    for page in strip_page_furniture(extracted["pages"])
+                    for line in page["lines"]
+                )
+                progress_bar = st.progress(0.0, text="Structuring questions...")
+                structured = get_llm_structurer().structure_exam(
+                    raw_text,
+                    progress=lambda done, total: progress_bar.progress(
+                        done / total, text=f"Structured {done}/{total} questions"
+                    ),
+                )
+                extracted["questions"] = structured["exam"]["content"]["questions"]
+                if structured["failed_batches"]:
+                    st.warning(
+                        f"{len(structured['failed_batches'])} of {structured['batches']} batches "
+                        "failed and were kept as raw text: "
+                        + structured["failed_batches"][0]["error"]
+                    )
+            if attach_images and extracted["questions"]:
+                if len(extracted["positions"]) == len(extracted["questions"]):
+                    with st.spinner("Uploading question images..."):
+                        selection = select_question_images(extracted["pages"], extracted["positions"])
+                        attached = attach_question_images(
+                            extracted["questions"],
+                            selection["images"],
+                            get_image_upload_cache(),
+                            prepare=prepare_question_image,
+                        )
+                    st.info(
+                        f"Attached {attached['uploaded']} images; skipped "
+                        + (", ".join(f"{count} {reason}" for reason, count in selection["skipped"].items()) or "none")
+                        + "."
+                    )
+                    for failure in attached["failed"]:
+                        st.error(f"Image for question {failure['question_index'] + 1} failed: {failure['error']}")
+                else:
+                    st.warning("Images were not attached: the structured questions do not line up with the PDF layout.")
+        except Exception as exc:
+            st.error(f"Could not read the PDF: {exc}")
+        else:
+            if extracted["questions"]:
+                # Replace the blank placeholders rather than appending after them.
+                kept = [q for q in questions if q["question"] or q["options"]]
+                st.session_state.exam_data["content"]["questions"] = kept + extracted["questions"]
+                st.success(
+                    f"Extracted {len(extracted['questions'])} questions from "
+                    f"{extracted['page_count']} pages. Switch to Normal to review them."
+                )
+            else:
+                st.warning("No numbered questions were found. Scanned PDFs without a text layer are not supported.")
+
+
 def show_create_exam_page():
     st.header("Create Exam")
 
@@ -382,63 +624,13 @@ def show_create_exam_page():
 
         questions = st.session_state.exam_data["content"]["questions"]
 
-        input_method = st.radio("Input Method", ["Normal", "JSON"])
+        input_method = st.radio("Input Method", ["Normal", "JSON", "PDF"])
 
         if input_method == "Normal":
-            # Each question in an expander
-            for i, question in enumerate(questions):
-                with st.expander(f"Question {i+1}", expanded=True):
-                    question_text = st.text_area(
-                        f"Question Text #{i+1}",
-                        question['question'],
-                        height=100,
-                        key=f"q{i}_text"
-                    )
-                    question['question'] = question_text
-
-                    st.write("Parsed Question:")
-                    st.text(question['question'])
+            show_question_editor(questions, "create", allow_image_upload=True, expanded=True)
 
-                    # Image upload
-                    uploaded_image = st.file_uploader(
-                        f"Upload an image for question #{i+1}",
-                        type=["png", "jpg", "jpeg"],
-                        key=f"q{i}_image"
-                    )
-                    if uploaded_image:
-                        image_obj = Image.open(uploaded_image)
-                        st.image(image_obj, caption="Uploaded Image", width=300)
-                        image_url = upload_image_to_cloudinary(image_obj)
-                        question['image_url'] = image_url
-                    elif 'image_url' in question:
-                        st.image(question['image_url'], caption="Question Image", width=300)
-
-                    # Options input
-                    options_text = st.text_area(
-                        "Options (one option per line, max 5 lines)",
-                        value="\n".join(question.get('options', {}).values()),
-                        height=150,
-                        key=f"q{i}_options"
-                    )
-                    new_options = parse_options(options_text)
-                    question['options'] = new_options
-
-                    st.write("Parsed Options:")
-                    for key, val in question['options'].items():
-                        st.text(f"{key}: {val}")
-
-                    correct_answers_input = st.text_input(
-                        "Correct Answer(s) (e.g., ABC, DE, A)",
-                        value="".join(question.get('correct_answers', [])),
-                        key=f"q{i}_correct_input"
-                    )
-                    new_correct_answers = [ans for ans in correct_answers_input.upper()
-                                           if ans in question['options']]
-                    question['correct_answers'] = new_correct_answers
-                    question['isAnswered'] = bool(new_correct_answers)
-
-                    st.write("Parsed Correct Answer(s):")
-                    st.text(", ".join(question['correct_answers']))
+        elif input_method == "PDF":
+            show_pdf_import(questions)
 
         else:  # JSON input method
             json_input = st.text_area("Paste JSON for questions here", height=300)
@@ -461,8 +653,16 @@ def show_create_exam_page():
         # D) Submit Exam
         st.markdown("---")
         if st.button("Submit Exam"):
-            # 1. Get exam_data
+            # 1. Get exam_data, once its images are uploaded
             exam_data = st.session_state.exam_data
+            failed_uploads = resolve_image_uploads(
+                exam_data["content"]["questions"],
+                st.session_state.get("pending_image_uploads", {}),
+            )
+            for index, error in sorted(failed_uploads.items()):
+                st.error(f"The image of question {index + 1} failed to upload: {error}. Upload it again, then resubmit.")
+            if failed_uploads:
+                return
 
             # 2. Convert to JSON
             json_str = json.dumps(exam_data, indent=2)
@@ -480,6 +680,28 @@ def show_create_exam_page():
 
 
 
+def load_parsed_exam(uploaded_file):
+    """
+    Parsed exam for an uploaded file. The content hash is computed once per upload and
+    remembered in the session, so a rerun is a dictionary lookup.
+    """
+    exam_cache = get_exam_cache()
+    upload_hashes = st.session_state.setdefault("upload_hashes", {})
+    file_id = getattr(uploaded_file, "file_id", None)
+    digest = upload_hashes.get(file_id) if file_id is not None else None
+    parsed = exam_cache.lookup(digest) if digest is not None else None
+    if parsed is None:
+        parsed = exam_cache.parse(uploaded_file.getvalue())
+        if file_id is not None:
+            upload_hashes[file_id] = parsed.content_hash
+    return parsed
+
+
+def go_to_question(index):
+    if index is not None:
+        st.session_state.visualize_question_number = index + 1
+
+
 def show_visualize_test_page():
     st.header("Visualize Test")
 
@@ -487,11 +709,14 @@ def show_visualize_test_page():
     
     if uploaded_file is not None:
         try:
-            exam_data = json.load(uploaded_file)
+            parsed = load_parsed_exam(uploaded_file)
+            if st.session_state.get("visualize_exam_hash") != parsed.content_hash:
+                st.session_state.visualize_exam_hash = parsed.content_hash
+                st.session_state.visualize_question_number = 1
             
             # Display metadata
             st.subheader("Exam Metadata")
-            metadata = exam_data.get("metadata", {})
+            metadata = parsed.metadata
             col1, col2 = st.columns(2)
             with col1:
                 st.write(f"School: {metadata.get('school', 'N/A')}")
@@ -507,49 +732,60 @@ def show_visualize_test_page():
             st.write(f"Unique Exam ID: {metadata.get('unique_id', 'N/A')}")
             
             # Display questions
-            questions = exam_data.get("content", {}).get("questions", [])
-            if questions:
+            if len(parsed):
                 st.subheader("Questions")
+                st.caption(
+                    f"{len(parsed.unanswered)} unanswered, {len(parsed.with_image)} with an image"
+                )
                 
                 # Question navigation
-                question_index = st.number_input("Go to question", min_value=1, max_value=len(questions), value=1) - 1
+                question_number = st.number_input(
+                    "Go to question",
+                    min_value=1,
+                    max_value=len(parsed),
+                    key="visualize_question_number",
+                )
+                question_index = parsed.index_of(question_number)
                 
                 # Display current question
-                question = questions[question_index]
-                st.write(f"Question {question_index + 1} of {len(questions)}")
-                st.write(question.get("question", ""))
+                render = parsed.render[question_index]
+                st.write(f"Question {render['number']} of {len(parsed)}")
+                st.write(render["text"])
                 
-                # Display image if present
-                if "image_url" in question:
+                # Display image if present; the next questions' images load in the background
+                image_cache = get_image_cache()
+                upcoming = parsed.render[question_index + 1:question_index + 1 + IMAGE_PREFETCH_AHEAD]
+                image_cache.prefetch(item["image_url"] for item in upcoming if item["image_url"])
+                if render["image_url"]:
                     try:
-                        with urlopen(question["image_url"]) as response:
-                            img = Image.open(io.BytesIO(response.read()))
-                        st.image(img, caption="Question Image", use_column_width=True)
+                        image_bytes = image_cache.get(render["image_url"])
+                        st.image(image_bytes, caption="Question Image", width="stretch")
                     except Exception as e:
                         st.error(f"Error loading image: {str(e)}")
                 
                 # Display options
-                options = question.get("options", {})
-                for option in ['A', 'B', 'C', 'D', 'E']:
-                    if option in options:
-                        st.write(f"{option}: {options[option]}")
+                for option, text in render["options"]:
+                    st.write(f"{option}: {text}")
                 
                 # Display correct answers
-                correct_answers = question.get("correct_answers", [])
-                st.write("Correct Answer(s):", ", ".join(correct_answers))
+                st.write("Correct Answer(s):", render["answers"])
                 
                 # Navigation buttons
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if question_index > 0:
-                        if st.button("Previous"):
-                            st.session_state.question_index = question_index - 1
-                            st.rerun()
+                        st.button("Previous", on_click=go_to_question, args=(question_index - 1,))
+                with col2:
+                    next_unanswered = parsed.next_unanswered(question_index)
+                    if next_unanswered is not None:
+                        st.button(
+                            "Next Unanswered",
+                            on_click=go_to_question,
+                            args=(next_unanswered,),
+                        )
                 with col3:
-                    if question_index < len(questions) - 1:
-                        if st.button("Next"):
-                            st.session_state.question_index = question_index + 1
-                            st.rerun()
+                    if question_index < len(parsed) - 1:
+                        st.button("Next", on_click=go_to_question, args=(question_index + 1,))
             else:
                 st.warning("No questions found in the uploaded JSON.")
         
@@ -564,52 +800,177 @@ def show_clean_folder_page():
     st.header("Clean Folder")
     st.write("Upload a ZIP archive, run the directory cleaner on its JSON files, and download the cleaned result.")
 
+    job_manager = get_clean_job_manager()
     uploaded_zip = st.file_uploader("Upload ZIP archive", type="zip", key="clean_folder_zip")
-    if uploaded_zip is None:
-        return
+    if uploaded_zip is not None:
+        st.write(f"Selected archive: {uploaded_zip.name}")
+        structure = st.checkbox(
+            "Split inline options out of question stems",
+            value=True,
+            help='Moves "A- ..." / "B) ..." lines found in a stem into the options.',
+        )
+        profile = st.checkbox("Profile this run (cProfile)", value=False)
+
+        if st.button("Run Cleaner", type="primary"):
+            try:
+                uploaded_zip.seek(0)
+                job_id = job_manager.submit(uploaded_zip, uploaded_zip.name, profile=profile, structure=structure)
+            except RuntimeError as exc:
+                st.error(str(exc))
+            else:
+                # The job ID in the URL lets a refreshed page find the job again.
+                st.query_params["clean_job"] = job_id
 
-    st.write(f"Selected archive: {uploaded_zip.name}")
+    job_id = st.query_params.get("clean_job")
+    if not job_id:
+        return
 
-    if st.button("Run Cleaner", type="primary"):
-        try:
-            with st.status("Cleaning uploaded folder...", expanded=True) as status_box:
-                result = clean_uploaded_archive(uploaded_zip, status_box=status_box)
-                st.session_state.clean_folder_result = result
-                status_box.update(label="Folder cleaned successfully.", state="complete")
-        except zipfile.BadZipFile:
-            st.session_state.clean_folder_result = None
+    status = job_manager.status(job_id)
+    if status is None:
+        st.info("This cleaning job has expired. Please run the cleaner again.")
+        return
+    if status["state"] in ("queued", "running"):
+        show_clean_job_progress(job_id)
+        return
+    if status["state"] == "failed":
+        if status.get("error_type") == "BadZipFile":
             st.error("The uploaded file is not a valid ZIP archive.")
-        except Exception as exc:
-            st.session_state.clean_folder_result = None
-            st.error(f"Folder cleaning failed: {exc}")
-
-    result = st.session_state.get("clean_folder_result")
-    if not result or result.get("source_filename") != uploaded_zip.name:
+        else:
+            st.error(f"Folder cleaning failed: {status['error']}")
         return
 
+    show_clean_folder_result(job_manager.result(job_id))
+
+
+@st.fragment(run_every=1.0)
+def show_clean_job_progress(job_id):
+    status = get_clean_job_manager().status(job_id)
+    if status is None or status["state"] not in ("queued", "running"):
+        # Finished: rerun the page to show the result.
+        st.rerun()
+
+    st.subheader(f"Cleaning {status['source_filename']}")
+    if status["state"] == "queued":
+        st.progress(0.0, text="Waiting for a free cleaning slot...")
+    else:
+        fraction = status["done"] / status["total"] if status["total"] else 0.0
+        st.progress(
+            fraction,
+            text=f"{status['stage'].capitalize()}: {status['done']}/{status['total']} files",
+        )
+    st.caption(f"Job {job_id}. You can refresh this page; the job keeps running.")
+
+
+def show_clean_folder_result(result):
     st.subheader("Cleaning Status")
-    col1, col2, col3 = st.columns(3)
+    stage_timings = result["timings"]["stages"]
+    pipeline_stages = {name: totals for name, totals in stage_timings.items() if name != "total"}
+    slowest_stage = max(pipeline_stages, key=lambda name: pipeline_stages[name]["wall_seconds"], default="-")
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Input JSON Files", result["input_json_files"])
         st.metric("Questions Cleaned", result["cleaned_questions"])
     with col2:
         st.metric("Cleaned JSON Files", result["cleaned_json_files"])
-        st.metric("Merged Outputs", len(result["merged_counts"]))
+        st.metric("Merged Outputs", result["merged_output_count"])
     with col3:
-        st.metric("Invalid Years", len(result["invalid_years"]))
-        st.metric("Duplicate Fixes", len(result["duplicate_answers"]))
+        st.metric("Invalid Years", result["invalid_year_count"])
+        st.metric("Duplicate Fixes", result["duplicate_answer_count"])
+        st.metric("Repaired Questions", result["repaired_question_count"])
+    with col4:
+        st.metric("Total Time", f"{stage_timings.get('total', {}).get('wall_seconds', 0.0):.2f} s")
+        st.metric("Slowest Stage", slowest_stage)
+
+    with st.expander("Stage Timings", expanded=False):
+        st.dataframe(
+            [
+                {
+                    "Stage": name,
+                    "Wall (s)": round(totals["wall_seconds"], 3),
+                    "CPU (s)": round(totals["cpu_seconds"], 3),
+                    "Calls": totals["calls"],
+                }
+                for name, totals in stage_timings.items()
+            ],
+            width="stretch",
+        )
+        st.write("Slowest files:")
+        st.dataframe(
+            [
+                {"File": entry["file"], "Seconds": round(entry["seconds"], 3)}
+                for entry in result["timings"]["slowest_files"]
+            ],
+            width="stretch",
+        )
+        if result.get("profile"):
+            st.code(result["profile"], language="text")
 
     st.download_button(
         "Download Cleaned ZIP",
-        data=result["archive_bytes"],
+        data=lambda: Path(result["archive_path"]).read_bytes(),
         file_name=result["download_name"],
         mime="application/zip",
+        on_click="ignore",
     )
 
     st.subheader("Reports")
-    for report_name, report_text in result["reports"].items():
-        with st.expander(report_name, expanded=report_name == "processing_report.txt"):
-            st.code(report_text or "No entries.", language="text")
+    st.code(result["processing_report"] or "No entries.", language="text")
+    st.caption(
+        "Detailed reports are in the downloaded ZIP: "
+        + ", ".join(result["reports"].values())
+    )
+
+    show_bulk_publish_section(result)
+
+
+def show_bulk_publish_section(result):
+    st.subheader("Publish to Drive")
+    st.write(
+        "Uploads every cleaned exam to the Drive folder and appends their rows to the "
+        "Metadata sheet. An interrupted run can be started again and only publishes what is left."
+    )
+    archive_hash = result["archive_sha256"][:16]
+
+    if st.button("Publish Cleaned Exams"):
+        progress_bar = st.progress(0.0, text="Uploading exams...")
+
+        def show_progress(done, total):
+            progress_bar.progress(done / total, text=f"Uploaded {done}/{total} exams")
+
+        try:
+            folder_id = st.secrets["gcp_drive"]["folder_id"]
+            spreadsheet_id = st.secrets["gcp_sheets"]["spreadsheet_id"]
+            # One journal per destination: re-cleaning the same exams and publishing again
+            # skips everything already uploaded instead of duplicating files and rows.
+            with zipfile.ZipFile(result["archive_path"]) as archive:
+                summary = publish_exams(
+                    iter_archive_exams(archive),
+                    get_google_clients(),
+                    folder_id,
+                    spreadsheet_id,
+                    journal_path_for(folder_id, spreadsheet_id),
+                    progress=show_progress,
+                )
+        except Exception as exc:
+            st.error(f"Publishing failed: {exc}")
+            return
+        st.session_state.publish_summary = {**summary, "archive_hash": archive_hash}
+
+    summary = st.session_state.get("publish_summary")
+    if not summary or summary["archive_hash"] != archive_hash:
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Uploaded", summary["uploaded_files"])
+    col2.metric("Already Published", summary["skipped_files"])
+    col3.metric("Sheet Rows Added", summary["appended_rows"])
+    if summary["failed_files"]:
+        st.warning(f"{len(summary['failed_files'])} exam(s) failed to upload. Run the publish again to retry them.")
+        st.dataframe(summary["failed_files"], width="stretch")
+    if summary["append_error"]:
+        st.warning(f"Appending to the Metadata sheet failed: {summary['append_error']}. Run the publish again to retry.")
+    if not summary["failed_files"] and not summary["append_error"]:
+        st.success(f"All {summary['total_files']} exams are published.")
 
 
 def show_edit_json_page():
@@ -622,8 +983,16 @@ def show_edit_json_page():
     
     if uploaded_file is not None:
         try:
-            if st.session_state.edited_data is None:
-                st.session_state.edited_data = json.load(uploaded_file)
+            parsed = load_parsed_exam(uploaded_file)
+            # The cached exam is shared, so edits go to a private copy of it. Copies are
+            # kept per file, so switching files does not lose earlier edits.
+            edited_exams = st.session_state.setdefault("edited_exams", {})
+            if parsed.content_hash not in edited_exams:
+                edited_exams[parsed.content_hash] = {
+                    "name": uploaded_file.name,
+                    "data": copy.deepcopy(parsed.exam),
+                }
+            st.session_state.edited_data = edited_exams[parsed.content_hash]["data"]
             
             data = st.session_state.edited_data
             
@@ -668,61 +1037,33 @@ def show_edit_json_page():
                 st.session_state.edited_data = data
                 st.rerun()
             
-            for i, question in enumerate(questions):
-                with st.expander(f"Question {i + 1}", expanded=False):
-                    question['question'] = st.text_area(f"Question Text #{i+1}", question['question'], height=100, key=f"q{i}_text")
-                    
-                    if 'image_url' in question:
-                        st.image(question['image_url'], caption="Question Image", width=300)
-                        if st.button(f"Remove Image for Question {i + 1}", key=f"remove_image_{i}"):
-                            del question['image_url']
-                            st.session_state.edited_data = data
-                            st.rerun()
-                    
-                    # Options input with automatic parsing
-                    options_text = st.text_area(
-                        "Options (one option per line, max 5 lines)",
-                        value="\n".join(question.get('options', {}).values()),
-                        height=150,
-                        key=f"q{i}_options"
-                    )
-                    
-                    # Parse options
-                    new_options = parse_options(options_text)
-                    if new_options != question.get('options', {}):
-                        question['options'] = new_options
-                        st.session_state.edited_data = data
-
-                    # Display parsed options
-                    st.write("Parsed Options:")
-                    for key, value in question['options'].items():
-                        st.text(f"{key}: {value}")
-                    
-                    # Correct answers input
-                    correct_answers_input = st.text_input(
-                        "Correct Answer(s) (e.g., ABC, DE, A)",
-                        value="".join(question.get('correct_answers', [])),
-                        key=f"q{i}_correct_input"
-                    )
-
-                    # Update correct answers
-                    new_correct_answers = [ans for ans in correct_answers_input.upper() if ans in question['options']]
-                    if new_correct_answers != question.get('correct_answers', []):
-                        question['correct_answers'] = new_correct_answers
-                        question['isAnswered'] = bool(new_correct_answers)
-                        st.session_state.edited_data = data
-
-                    # Display selected correct answers
-                    st.write("Parsed Correct Answer(s):")
-                    st.text(", ".join(question['correct_answers']))
+            # Widget keys are per file: a keyed widget keeps its own value and would write
+            # the previous file's text into this file's questions.
+            show_question_editor(questions, f"edit_{parsed.content_hash[:16]}")
             
-            # Generate and download updated JSON
-            if st.button("Download Updated JSON"):
-                json_str = json.dumps(st.session_state.edited_data, indent=2)
-                b64 = base64.b64encode(json_str.encode()).decode()
-                file_name = f"updated_{uploaded_file.name}"
-                href = f'<a href="data:application/json;base64,{b64}" download="{file_name}">Download Updated JSON</a>'
-                st.markdown(href, unsafe_allow_html=True)
+            # Download updated JSON; the bytes are only built when a button is clicked
+            st.subheader("Download")
+            col1, col2 = st.columns(2)
+            with col1:
+                compact = st.checkbox("Compact JSON (no indentation)", value=False)
+            with col2:
+                use_gzip = st.checkbox("Gzip", value=False)
+            file_name = f"updated_{uploaded_file.name}" + (".gz" if use_gzip else "")
+            st.download_button(
+                "Download Updated JSON",
+                data=lambda: exam_download_bytes(data, compact, use_gzip),
+                file_name=file_name,
+                mime="application/gzip" if use_gzip else "application/json",
+                on_click="ignore",
+            )
+            if len(edited_exams) > 1:
+                st.download_button(
+                    f"Download All {len(edited_exams)} Edited Exams (ZIP)",
+                    data=lambda: edited_exams_zip(edited_exams.values(), compact),
+                    file_name="edited_exams.zip",
+                    mime="application/zip",
+                    on_click="ignore",
+                )
         
         except json.JSONDecodeError:
             st.error("Invalid JSON file. Please upload a valid exam JSON file.")
@@ -732,7 +1073,10 @@ def show_edit_json_page():
 def main():
     st.set_page_config(page_title="MEDQUEST Admin Tool", layout="wide")
 
-    page = st.sidebar.selectbox("Select a page", ["Create Exam", "Visualize Test", "Edit JSON", "Clean Folder"])
+    page = st.sidebar.selectbox(
+        "Select a page",
+        ["Create Exam", "Visualize Test", "Edit JSON", "Clean Folder", "Answer Filling", "Correction Linking"],
+    )
 
     if page == "Create Exam":
         show_create_exam_page()
@@ -742,6 +1086,10 @@ def main():
         show_edit_json_page()
     elif page == "Clean Folder":
         show_clean_folder_page()
+    elif page == "Answer Filling":
+        show_answer_filling_page()
+    elif page == "Correction Linking":
+        show_correction_linking_page()
 
 if __name__ == "__main__":
     main()